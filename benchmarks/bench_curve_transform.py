@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import datetime
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing_scripts"))
+from curve_transform import curve_frame  # noqa: E402
+
+
+def legacy_process_raw_to_dataframe(data, var):
+    # The per-part implementation curve_frame replaced, kept for comparison.
+    dataframes = []
+    for part, data_section in data.items():
+        df = pd.DataFrame(data_section[var])
+        df = df.dropna(axis="columns", how="all")
+        df = df.dropna(axis="rows", thresh=df.shape[1]-1)
+        df.reset_index(inplace=True, drop=True)
+        df.columns = df.iloc[0].values
+        if "months:" in df.columns:
+            df.rename(columns={"months:": "date"}, inplace=True)
+            period_type = "month"
+        elif "years:" in df.columns:
+            df.rename(columns={"years:": "date"}, inplace=True)
+            period_type = "year"
+        df = df[2:].set_index("date")
+        df.columns = df.columns.map(lambda col: str(round(col, 2)))
+        df.columns = df.columns.map(lambda col: col[:-2] if str(col).endswith(".0") else col)
+        df.columns = df.columns.map(lambda x: f"{var}_{period_type}_{x}")
+        dataframes.append(df)
+    return pd.concat(dataframes).fillna(value=np.nan)
+
+
+def synthetic_sheet(start, n_days, maturities, seed):
+    rng = np.random.default_rng(seed)
+    rows = [["Nominal forward curve"] + [None] * len(maturities),
+            [None] * (len(maturities) + 1),
+            ["years:"] + list(maturities),
+            [None] + list(maturities)]
+    values = rng.normal(4, 1, size=(n_days, len(maturities)))
+    # The legacy dropna keeps rows missing at most one value, so only the
+    # shortest maturity has gaps.
+    values[rng.random(n_days) < 0.05, 0] = np.nan
+    for i, row in enumerate(values.tolist()):
+        rows.append([start + datetime.timedelta(days=i)] + [None if v != v else v for v in row])
+    return rows
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(n_parts=7, days_per_part=1800, n_maturities=50):
+    maturities = np.round(np.arange(1, n_maturities + 1) * 0.5, 2).tolist()
+    data = {f"part{i+1}": {"glc_nom_forward": synthetic_sheet(datetime.datetime(1979 + 5 * i, 1, 1),
+                                                              days_per_part, maturities, i)}
+            for i in range(n_parts)}
+    legacy, legacy_time, legacy_peak = measure(
+        lambda: legacy_process_raw_to_dataframe(data, "glc_nom_forward"))
+    new, new_time, new_peak = measure(
+        lambda: curve_frame([section["glc_nom_forward"] for section in data.values()],
+                            "glc_nom_forward"))
+    pd.testing.assert_frame_equal(legacy.astype(float).set_axis(pd.to_datetime(legacy.index)),
+                                  new, check_names=False)
+    output_bytes = new.values.nbytes
+    print(f"{n_parts} parts x {days_per_part} rows x {n_maturities} maturities,",
+          f"{output_bytes / 1e6:.1f} MB of float64 output")
+    for name, elapsed, peak in (("legacy", legacy_time, legacy_peak), ("curve_frame", new_time, new_peak)):
+        print(f"{name:>12}: {elapsed * 1e3:8.1f} ms, peak traced {peak / 1e6:7.1f} MB",
+              f"({peak / output_bytes:.1f}x output)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing_scripts"))
+from storage import PROFILES, cast_schema, row_group_size, write_parquet, writer_options  # noqa: E402
+
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processed_data")
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _max_relative_error(original, stored):
+    floats = original.select_dtypes("float").columns
+    if not len(floats):
+        return 0.0
+    a = original[floats].to_numpy(dtype=np.float64)
+    b = stored[floats].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error = np.abs(a - b) / np.abs(a)
+    return float(np.nanmax(error, initial=0.0))
+
+
+def bench_file(path, profiles, scratch, repeat=3):
+    """Size, write, full read and one-year read time of path under each profile."""
+    df = pd.read_parquet(path)
+    index = pd.DatetimeIndex(df.index) if isinstance(df.index, pd.DatetimeIndex) else None
+    year = None
+    if index is not None and len(index):
+        middle = index.sort_values()[len(index) // 2]
+        year = (middle - pd.DateOffset(months=6), middle + pd.DateOffset(months=6))
+    results = {}
+    for profile in profiles:
+        out = os.path.join(scratch, f"{profile}.parquet")
+        write_seconds, _ = _timed(lambda: write_parquet(df, out, profile), repeat)
+        read_seconds, stored = _timed(lambda: pd.read_parquet(out), repeat)
+        result = {"bytes": os.path.getsize(out),
+                  "row_groups": pq.ParquetFile(out).num_row_groups,
+                  "write_seconds": write_seconds,
+                  "read_seconds": read_seconds,
+                  "year_read_seconds": None,
+                  "max_relative_error": _max_relative_error(df, stored.reindex(df.index))}
+        if year is not None:
+            filters = [(index.name or "date", ">=", year[0]), (index.name or "date", "<", year[1])]
+            result["year_read_seconds"], _ = _timed(
+                lambda: pq.read_table(out, filters=filters).to_pandas(), repeat)
+        results[profile] = result
+    return results
+
+
+def _partitions(path):
+    # Hive partition keys in nesting order, e.g. ["area_code"] for uk_full_hpi
+    keys = []
+    while os.path.isdir(path):
+        entries = sorted(entry for entry in os.listdir(path)
+                         if "=" in entry and os.path.isdir(os.path.join(path, entry)))
+        if not entries:
+            break
+        keys.append(entries[0].split("=", 1)[0])
+        path = os.path.join(path, entries[0])
+    return keys
+
+
+def _write_dataset(table, out, partitions, profile):
+    table = table.cast(cast_schema(table.schema, profile))
+    rows = row_group_size(table.num_rows, table.num_columns, profile)
+    options = {"max_rows_per_group": rows, "min_rows_per_group": rows} if rows else {}
+    ds.write_dataset(table, out, format="parquet", partitioning=partitions,
+                     partitioning_flavor="hive", existing_data_behavior="delete_matching",
+                     file_options=ds.ParquetFileFormat().make_write_options(**writer_options(profile)),
+                     **options)
+
+
+def bench_dataset(path, profiles, scratch, repeat=3):
+    """bench_file for a partitioned directory, rewritten with the same partitioning."""
+    partitions = _partitions(path)
+    table = ds.dataset(path, partitioning="hive").to_table()
+    keys = [(key, "ascending") for key in partitions + (["date"] if "date" in table.column_names else [])]
+    df = table.sort_by(keys).to_pandas()
+    year = None
+    if "date" in df and len(df):
+        middle = df["date"].sort_values().iloc[len(df) // 2]
+        year = (middle - pd.DateOffset(months=6), middle + pd.DateOffset(months=6))
+    results = {}
+    for profile in profiles:
+        out = os.path.join(scratch, profile)
+        write_seconds, _ = _timed(lambda: _write_dataset(table, out, partitions, profile), repeat)
+        read_seconds, stored = _timed(lambda: ds.dataset(out, partitioning="hive").to_table(), repeat)
+        files = ds.dataset(out, partitioning="hive").files
+        result = {"bytes": sum(os.path.getsize(file) for file in files),
+                  "row_groups": sum(pq.ParquetFile(file).num_row_groups for file in files),
+                  "write_seconds": write_seconds,
+                  "read_seconds": read_seconds,
+                  "year_read_seconds": None,
+                  "max_relative_error": _max_relative_error(df, stored.sort_by(keys).to_pandas())}
+        if year is not None:
+            dataset = ds.dataset(out, partitioning="hive")
+            where = (ds.field("date") >= year[0]) & (ds.field("date") < year[1])
+            result["year_read_seconds"], _ = _timed(lambda: dataset.to_table(filter=where), repeat)
+        results[profile] = result
+    return results
+
+
+def bench_directory(directory=DEFAULT_DIR, profiles=None, repeat=3):
+    # Versioned copies (<name>-NNNNNN) sit behind their <name> symlink.
+    entries = sorted(entry for entry in os.listdir(directory)
+                     if not re.fullmatch(r".+-\d{6}", entry)
+                     and (entry.endswith(".parquet") and os.path.isfile(os.path.join(directory, entry))
+                          or _partitions(os.path.join(directory, entry))))
+    report = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for entry in entries:
+            bench = bench_dataset if _partitions(os.path.join(directory, entry)) else bench_file
+            work = os.path.join(scratch, entry)
+            os.makedirs(work)
+            report[entry] = bench(os.path.join(directory, entry), profiles or list(PROFILES),
+                                  work, repeat)
+    return report
+
+
+def _print_report(report):
+    print(f"{'file':<40}{'profile':<9}{'MB':>9}{'groups':>8}{'write':>9}{'read':>9}{'1y read':>9}{'max err':>10}")
+    for file, results in report.items():
+        for profile, r in results.items():
+            year = f"{r['year_read_seconds']:>8.3f}s" if r["year_read_seconds"] is not None else f"{'-':>9}"
+            print(f"{file:<40}{profile:<9}{r['bytes'] / 1e6:>9.2f}{r['row_groups']:>8}"
+                  f"{r['write_seconds']:>8.3f}s{r['read_seconds']:>8.3f}s{year}{r['max_relative_error']:>10.1e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the parquet storage profiles on the processed data")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    parser.add_argument("--profiles", nargs="*", choices=list(PROFILES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, best one kept")
+    parser.add_argument("-o", "--output", help="also write the report as JSON")
+    args = parser.parse_args()
+    report = bench_directory(args.directory, args.profiles, args.repeat)
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
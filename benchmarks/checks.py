@@ -0,0 +1,132 @@
+import os
+import sys
+import zipfile
+import argparse
+import contextlib
+import tempfile
+import traceback
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+import synthetic  # puts processing_scripts on the path
+import bank_rate  # noqa: E402
+import boe_rate_pipeline  # noqa: E402
+import govt_liability_curve_pipeline as glc  # noqa: E402
+import incremental  # noqa: E402
+from storage import PROFILE_ENV  # noqa: E402
+
+
+MEMBERS = ["a.xlsx", "b.xlsx", "c.xlsx"]
+# start, business days, yearly maturities; b overlaps the end of a and
+# the start of c, and a covers dates in b's span that b does not.
+SPANS = {"a.xlsx": ("2000-01-03", 780, 10), "b.xlsx": ("2001-01-01", 261, 12),
+         "c.xlsx": ("2002-06-03", 520, 8)}
+
+
+def _member(start, days, n_maturities, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=days).to_pydatetime()
+    wb = synthetic._workbook()
+    for sheet, marker in synthetic.CURVE_SHEETS.items():
+        maturities = np.arange(1, 61) if marker == "months:" else np.round(np.arange(1, n_maturities + 1) * 0.5, 2)
+        synthetic._curve_sheet(wb, sheet, marker, maturities, dates, rng)
+    return synthetic._workbook_bytes(wb)
+
+
+class _Zip:
+    """A GLC inflation zip of MEMBERS whose workbooks can be revised one at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.spans = dict(SPANS)
+        self.members = {name: _member(*span, seed=0) for name, span in self.spans.items()}
+        self.write()
+
+    def revise(self, name, start=None, days=None):
+        start, old_days, n_maturities = self.spans[name]
+        self.spans[name] = (start, days or old_days, n_maturities)
+        self.members[name] = _member(*self.spans[name], seed=len(self.members[name]) + 1)
+        self.write()
+
+    def write(self):
+        with zipfile.ZipFile(self.path, "w") as zf:
+            for name in MEMBERS:
+                zf.writestr(name, self.members[name])
+
+
+def _refresh_matches_full_build(revisions):
+    with tempfile.TemporaryDirectory() as work:
+        path_to_zip, parquet_path = os.path.join(work, "t.zip"), os.path.join(work, "t.parquet")
+        source = _Zip(path_to_zip)
+        metadata = dict(glc.glc_metadata["inflation"], path=path_to_zip)
+        with mock.patch.dict(glc.glc_metadata, {"inflation": metadata}):
+            def build(members):
+                return glc._build_dataframe("inflation", members)
+            incremental.refresh(parquet_path, path_to_zip, MEMBERS, build)
+            for revision in revisions:
+                source.revise(*revision)
+                incremental.refresh(parquet_path, path_to_zip, MEMBERS, build, incremental=True, verify=True)
+                stored = pd.read_parquet(parquet_path)
+                if not stored.equals(incremental._as_stored(build(MEMBERS))):
+                    raise AssertionError(f"after revising {revision}, the stored frame differs from a full build")
+
+
+def check_incremental_revisions():
+    """Revising the newest, middle and oldest workbook each leaves a full build's frame."""
+    _refresh_matches_full_build([("c.xlsx",), ("b.xlsx",), ("a.xlsx",), ("c.xlsx",)])
+
+
+def check_incremental_archive_profile():
+    """As above, with the history stored as float32 by the archive profile."""
+    with mock.patch.dict(os.environ, {PROFILE_ENV: "archive"}):
+        _refresh_matches_full_build([("c.xlsx",), ("b.xlsx",)])
+
+
+def check_incremental_dropped_dates():
+    """The newest workbook losing its last dates, then moving its start, drops the old rows."""
+    _refresh_matches_full_build([("c.xlsx", None, 400), ("c.xlsx", "2002-09-02", 300)])
+
+
+def check_boe_rate_fills_every_day():
+    """boe_rate.parquet has a rate on every day, the one bank_rate.as_of looks up."""
+    with tempfile.TemporaryDirectory() as work:
+        for directory in ["raw_data", "processed_data", "processing_scripts"]:
+            os.makedirs(os.path.join(work, directory))
+        synthetic.write_bank_rate_csv(os.path.join(work, "raw_data", "Bank Rate  Bank of England Database.csv"))
+        with contextlib.chdir(os.path.join(work, "processing_scripts")):
+            boe_rate_pipeline.process()
+            daily = pd.read_parquet("../processed_data/boe_rate.parquet")
+            changes = pd.read_parquet("../processed_data/boe_rate_changes.parquet")
+        if daily["rate"].isna().any():
+            raise AssertionError(f"{daily['rate'].isna().sum()} days have no rate")
+        expected = bank_rate.as_of(daily.index, changes)
+        if not (daily["rate"].to_numpy() == expected["rate"].to_numpy()).all() \
+                or not (daily["changed"].to_numpy() == expected["changed"].to_numpy()).all():
+            raise AssertionError("boe_rate.parquet differs from bank_rate.as_of")
+
+
+CHECKS = {name: fn for name, fn in globals().items() if name.startswith("check_")}
+
+
+def run_checks(names=None):
+    """Run the named checks (default all); returns the names of those that failed."""
+    failed = []
+    for name in names or CHECKS:
+        try:
+            CHECKS[name]()
+            print(f"ok      {name}")
+        except Exception:
+            print(f"FAILED  {name}\n{traceback.format_exc()}")
+            failed.append(name)
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check pipeline behaviour on synthetic inputs")
+    parser.add_argument("checks", nargs="*", help=f"subset of {', '.join(CHECKS)}")
+    args = parser.parse_args()
+    unknown = set(args.checks) - set(CHECKS)
+    if unknown:
+        parser.error(f"unknown checks {sorted(unknown)}")
+    sys.exit(1 if run_checks(args.checks) else 0)
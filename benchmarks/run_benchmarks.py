@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+import shutil
+import inspect
+import argparse
+import platform
+import tempfile
+import importlib
+import traceback
+import tracemalloc
+import contextlib
+from collections import defaultdict
+from unittest import mock
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import synthetic  # puts processing_scripts on the path
+
+
+PIPELINES = ["boe_rate_pipeline",
+             "ftse100_pdfs_pipeline",
+             "short_sterling_pdfs_pipeline",
+             "uk_house_price_index_pipeline",
+             "uk_full_hpi_pipeline",
+             "overnight_index_swap_pipeline",
+             "govt_liability_curve_pipeline",
+             "bank_liability_nominal_curve_pipeline",
+             "combine"]
+PHASES = ["read", "transform", "write"]
+# Phases shorter than this are too noisy to flag as regressions.
+NOISE_FLOOR_SECONDS = 0.05
+
+
+class PhaseTimer:
+    """Splits a run into read, write and everything else (transform).
+
+    Entering a phase closes the enclosing one, so each phase's time and peak
+    traced memory are its own. A read inside a write (or vice versa) is
+    counted towards the outer phase.
+    """
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.stack = ["transform"]
+        self.seconds = defaultdict(float)
+        self.peaks = defaultdict(int)
+        self.calls = defaultdict(int)
+
+    def _mark_peak(self):
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.peaks[self.stack[-1]] = max(self.peaks[self.stack[-1]], peak)
+            tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.stack[-1] != "transform":
+            yield
+            return
+        self._mark_peak()
+        self.stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.calls[name] += 1
+            self._mark_peak()
+            self.stack.pop()
+
+    def wrap(self, fn, name):
+        def wrapper(*args, **kwargs):
+            with self.phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def _patches(timer, module):
+    targets = [(pd, "read_csv", "read"), (pd, "read_parquet", "read"), (pq, "read_table", "read"),
+               (pd.DataFrame, "to_parquet", "write"), (pq, "write_table", "write"),
+               (pq.ParquetWriter, "write_table", "write"), (ds, "write_dataset", "write")]
+    targets += [(module, attr, "read") for attr in ("read_workbook", "read_spreadsheets")
+                if hasattr(module, attr)]
+    stack = contextlib.ExitStack()
+    for owner, attr, name in targets:
+        stack.enter_context(mock.patch.object(owner, attr, timer.wrap(getattr(owner, attr), name)))
+    return stack
+
+
+def run_pipeline(name, options, trace_memory=True):
+    module = importlib.import_module(name)
+    fn = module.combine_data if name == "combine" else module.process
+    params = inspect.signature(fn).parameters
+    kwargs = {key: value for key, value in options.items() if key in params}
+
+    timer = PhaseTimer(trace_memory)
+    result = {"error": None}
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with _patches(timer, module):
+            fn(**kwargs)
+    except Exception:
+        result["error"] = traceback.format_exc(limit=3)
+    total = time.perf_counter() - start
+    timer._mark_peak()
+    if trace_memory:
+        tracemalloc.stop()
+
+    timer.seconds["transform"] = max(total - timer.seconds["read"] - timer.seconds["write"], 0.0)
+    result["seconds"] = total
+    result["phases"] = {phase: {"seconds": timer.seconds[phase],
+                                "calls": timer.calls[phase],
+                                "peak_traced_bytes": timer.peaks[phase] if trace_memory else None}
+                        for phase in PHASES}
+    result["peak_traced_bytes"] = max(timer.peaks.values(), default=0) if trace_memory else None
+    return result
+
+
+def _input_sizes(raw_dir):
+    return {file: os.path.getsize(os.path.join(raw_dir, file)) for file in sorted(os.listdir(raw_dir))}
+
+
+def _environment():
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "pyarrow": pa.__version__}
+
+
+def run_benchmarks(years=5, maturities=40, hpi_regions=400, pipelines=None,
+                   options=None, trace_memory=True, workdir=None):
+    """Generate synthetic raw data in a scratch tree and time every pipeline on it.
+
+    The scratch tree mirrors the repo (raw_data/, processed_data/ and a
+    working directory processing_scripts/), so the pipelines' relative paths
+    resolve inside it. Pipelines run in PIPELINES order, so combine sees
+    their outputs.
+    """
+    root = workdir or tempfile.mkdtemp(prefix="uk-economic-data-bench-")
+    raw_dir = os.path.join(root, "raw_data")
+    os.makedirs(os.path.join(root, "processing_scripts"), exist_ok=True)
+    start = time.perf_counter()
+    synthetic.generate(raw_dir, years=years, maturities=maturities, hpi_regions=hpi_regions)
+    generate_seconds = time.perf_counter() - start
+
+    report = {"environment": _environment(),
+              "parameters": {"years": years, "maturities": maturities, "hpi_regions": hpi_regions,
+                             "options": options or {}, "trace_memory": trace_memory},
+              "generate_seconds": generate_seconds,
+              "input_bytes": _input_sizes(raw_dir),
+              "results": {}}
+    cwd = os.getcwd()
+    os.chdir(os.path.join(root, "processing_scripts"))
+    # The sheet cache would turn repeated benchmark runs into cache reads.
+    with mock.patch.dict(os.environ, {"PIPELINE_CACHE_DIR": ""}):
+        try:
+            for name in pipelines or PIPELINES:
+                result = run_pipeline(name, options or {}, trace_memory)
+                report["results"][name] = result
+                status = "failed" if result["error"] else f"{result['seconds']:.2f}s"
+                print(f"{name}: {status}", flush=True)
+        finally:
+            os.chdir(cwd)
+            if workdir is None:
+                shutil.rmtree(root, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, threshold=0.2):
+    """Return (pipeline, phase, baseline seconds, new seconds) for every slowdown over threshold."""
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or result["error"] or previous["error"]:
+            continue
+        for phase in PHASES + ["total"]:
+            old = previous["seconds"] if phase == "total" else previous["phases"][phase]["seconds"]
+            new = result["seconds"] if phase == "total" else result["phases"][phase]["seconds"]
+            if old >= NOISE_FLOOR_SECONDS and new > old * (1 + threshold):
+                regressions.append((name, phase, old, new))
+    return regressions
+
+
+def _print_report(report):
+    print(f"\n{'pipeline':<40}{'total':>9}" + "".join(f"{phase:>11}" for phase in PHASES) + f"{'peak MB':>10}")
+    for name, result in report["results"].items():
+        if result["error"]:
+            print(f"{name:<40}  failed: {result['error'].strip().splitlines()[-1]}")
+            continue
+        phases = "".join(f"{result['phases'][phase]['seconds']:>10.2f}s" for phase in PHASES)
+        peak = result["peak_traced_bytes"]
+        peak = f"{peak / 1e6:>10.1f}" if peak is not None else f"{'-':>10}"
+        print(f"{name:<40}{result['seconds']:>8.2f}s{phases}{peak}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the pipelines on synthetic inputs")
+    parser.add_argument("--years", type=float, default=5, help="years of daily data per curve")
+    parser.add_argument("--maturities", type=int, default=40, help="yearly maturities per curve sheet")
+    parser.add_argument("--hpi-regions", type=int, default=400, help="regions in the UK-HPI full file")
+    parser.add_argument("--pipelines", nargs="*", help=f"subset of {', '.join(PIPELINES)}")
+    parser.add_argument("--workers", type=int, help="processes per spreadsheet pipeline")
+    parser.add_argument("--engine", choices=["openpyxl", "stream"])
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc, which slows the run")
+    parser.add_argument("--workdir", help="keep the generated inputs and outputs here")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="where to write the JSON report")
+    parser.add_argument("--compare", help="baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+    unknown = set(args.pipelines or []) - set(PIPELINES)
+    if unknown:
+        parser.error(f"unknown pipelines {sorted(unknown)}")
+    options = {key: value for key, value in
+               {"workers": args.workers, "engine": args.engine}.items() if value}
+
+    report = run_benchmarks(args.years, args.maturities, args.hpi_regions, args.pipelines,
+                            options, not args.no_memory, args.workdir)
+    _print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nreport written to {args.output}")
+
+    failed = [name for name, result in report["results"].items() if result["error"]]
+    for name in failed:
+        print(f"FAILED {name}:\n{report['results'][name]['error']}")
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for name, phase, old, new in regressions:
+            print(f"REGRESSION {name} {phase}: {old:.2f}s -> {new:.2f}s")
+    sys.exit(1 if failed or regressions else 0)
@@ -0,0 +1,205 @@
+import io
+import os
+import sys
+import zipfile
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing_scripts"))
+import govt_liability_curve_pipeline  # noqa: E402
+import bank_liability_nominal_curve_pipeline  # noqa: E402
+import overnight_index_swap_pipeline  # noqa: E402
+
+
+CURVE_SHEETS = {"1. fwds, short end": "months:",
+                "2. fwd curve": "years:",
+                "3. spot, short end": "months:",
+                "4. spot curve": "years:"}
+OIS_SHEETS = ["1. fwd curve", "2. spot curve"]
+PERCENTILES = [0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95]
+PROPERTY_TYPES = ["Detached", "Semi Detached", "Terraced", "Flat"]
+
+
+def _business_days(start, years):
+    return pd.bdate_range(start, periods=int(years * 261)).to_pydatetime()
+
+
+def _workbook():
+    # Not write_only: that mode leaves out the <dimension> element, which
+    # Excel always writes and the readers rely on to size each sheet.
+    wb = Workbook()
+    wb.remove(wb.active)
+    return wb
+
+
+def _workbook_bytes(wb):
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _curve_sheet(wb, name, marker, maturities, dates, rng):
+    ws = wb.create_sheet(name)
+    ws.append([f"Synthetic {name}"])
+    ws.append([])
+    ws.append([marker] + list(maturities))
+    ws.append([None] + list(maturities))
+    values = rng.normal(3, 1, size=(len(dates), len(maturities)))
+    # Gaps only at the shortest maturity, so the pipelines' row threshold
+    # (at most one missing value) keeps every date.
+    values[rng.random(len(dates)) < 0.05, 0] = np.nan
+    for date, row in zip(dates, values.tolist()):
+        ws.append([date] + [None if v != v else v for v in row])
+
+
+def _split_years(members, years, first_year):
+    per_member = years / len(members)
+    for i, member in enumerate(members):
+        start = pd.Timestamp(year=first_year, month=1, day=1) + pd.DateOffset(days=int(i * per_member * 365))
+        yield member, _business_days(start, per_member)
+
+
+def write_curve_zip(path, members, years, n_maturities, first_year=1979, seed=0):
+    """A GLC/BLC-style zip: one workbook per member with the four curve sheets."""
+    rng = np.random.default_rng(seed)
+    years_maturities = np.round(np.arange(1, n_maturities + 1) * 0.5, 2)
+    month_maturities = np.arange(1, 61)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for member, dates in _split_years(members, years, first_year):
+            wb = _workbook()
+            for sheet, marker in CURVE_SHEETS.items():
+                maturities = month_maturities if marker == "months:" else years_maturities
+                _curve_sheet(wb, sheet, marker, maturities, dates, rng)
+            zf.writestr(member, _workbook_bytes(wb))
+
+
+def write_ois_zip(path, members, years, n_maturities=60, first_year=2009, seed=0):
+    """An OIS-style zip; columns are read positionally, so months are 1..n."""
+    rng = np.random.default_rng(seed)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for member, dates in _split_years(members, years, first_year):
+            wb = _workbook()
+            for sheet in OIS_SHEETS:
+                _curve_sheet(wb, sheet, "months:", range(1, n_maturities + 1), dates, rng)
+            zf.writestr(member, _workbook_bytes(wb))
+
+
+def _pdf_header(vol_point):
+    groups = (["Description"]
+              + ["Moments of LEVEL distribution"] * 5
+              + ["Moments of LOGARITHMIC distribution"] * 4
+              + ["PERCENTILES of distribution"] * len(PERCENTILES)
+              + ["Implied volatilities"])
+    labels = ([None, "Mean", "Deviation", "Median", "Skew", "Kurtosis",
+               "Mean", "Deviation", "Skew", "Kurtosis"]
+              + PERCENTILES + [vol_point])
+    return groups, labels
+
+
+def write_pdf_workbook(path, sheets, years, first_year=1998, seed=0):
+    """Implied-PDF workbook: two title rows then the 3-row header _clean_col expects.
+
+    The group row is repeated across its columns rather than left as merged
+    cells, which is what the pipelines forward-fill it into.
+    """
+    rng = np.random.default_rng(seed)
+    dates = _business_days(pd.Timestamp(year=first_year, month=1, day=1), years)
+    wb = _workbook()
+    for sheet, vol_point in sheets.items():
+        ws = wb.create_sheet(sheet)
+        groups, labels = _pdf_header(vol_point)
+        ws.append([f"Synthetic implied PDFs, {sheet}"])
+        ws.append(["Source: synthetic"])
+        ws.append(groups)
+        ws.append(["(yyyy-mm-dd)"])
+        ws.append(labels)
+        values = rng.normal(100, 10, size=(len(dates), len(groups) - 1))
+        for date, row in zip(dates, values.tolist()):
+            ws.append([date] + row)
+    wb.save(path)
+
+
+def write_hpi_workbook(path, years, n_regions=50, first_year=1995, seed=0):
+    """UK_House_price_index.xlsx with the 'By type' and per-measure sheets."""
+    rng = np.random.default_rng(seed)
+    months = pd.date_range(pd.Timestamp(year=first_year, month=1, day=1),
+                           periods=int(years * 12), freq="MS")
+    wb = _workbook()
+    wb.create_sheet("Metadata").append(["Synthetic UK house price index"])
+
+    ws = wb.create_sheet("By type")
+    ws.append(["Synthetic prices by property type"])
+    by_type = [(region, measure, kind) for region in ["London", "United Kingdom"]
+               for measure in ["Price", "Index"] for kind in PROPERTY_TYPES]
+    for level in range(3):
+        ws.append([None, None] + [column[level] for column in by_type])
+    for month in months:
+        ws.append([month.year, month.strftime("%B")]
+                  + rng.normal(200_000, 20_000, len(by_type)).tolist())
+
+    regions = [f"Region {i}" for i in range(n_regions)]
+    for sheet in ["Average price", "Index Price", "Sales Volume"]:
+        ws = wb.create_sheet(sheet)
+        # Text in A1/A2, as in the published file, so column A is read as
+        # mixed text and dates rather than as a date column.
+        ws.append(["Date"] + regions)
+        ws.append(["Area code"] + [f"E{i:08d}" for i in range(n_regions)])
+        for month in months:
+            ws.append([month.to_pydatetime()] + rng.normal(100, 10, n_regions).tolist())
+    wb.save(path)
+
+
+def write_full_hpi_csv(path, years, n_regions=400, first_year=1995, seed=0):
+    """UK-HPI full file: one row per region per month."""
+    rng = np.random.default_rng(seed)
+    months = pd.date_range(pd.Timestamp(year=first_year, month=1, day=1),
+                           periods=int(years * 12), freq="MS")
+    n = len(months) * n_regions
+    df = pd.DataFrame({
+        "Date": np.repeat(months.strftime("%d/%m/%Y"), n_regions),
+        "RegionName": np.tile([f"Region {i}" for i in range(n_regions)], len(months)),
+        "AreaCode": np.tile([f"E{i:08d}" for i in range(n_regions)], len(months)),
+    })
+    measures = ["AveragePrice", "Index", "IndexSA", "1m%Change", "12m%Change", "AveragePriceSA",
+                "SalesVolume", "DetachedPrice", "DetachedIndex", "Detached1m%Change",
+                "Detached12m%Change", "SemiDetachedPrice", "TerracedPrice", "FlatPrice",
+                "CashPrice", "MortgagePrice", "FTBPrice", "FTBIndex", "FOOPrice", "FOOIndex",
+                "NewPrice", "OldPrice"]
+    for measure in measures:
+        df[measure] = rng.normal(100, 10, n).round(2)
+    df.to_csv(path, index=False)
+
+
+def write_bank_rate_csv(path, n_changes=200, first_year=1975, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime(np.sort(rng.choice(
+        pd.date_range(pd.Timestamp(year=first_year, month=7, day=27), "2020-03-19").values,
+        n_changes, replace=False)))
+    rates = np.round(rng.uniform(0.1, 17, n_changes), 2)
+    pd.DataFrame({"Date Changed": dates.strftime("%d %b %y")[::-1],
+                  "Rate": rates[::-1]}).to_csv(path, index=False)
+
+
+def generate(raw_dir, years=5, maturities=40, hpi_regions=400):
+    """Write every raw input the pipelines read into raw_dir.
+
+    Each file reproduces the layout its pipeline parses (sheet names, header
+    rows, zip member names) with random values.
+    """
+    os.makedirs(raw_dir, exist_ok=True)
+    for data_type, metadata in govt_liability_curve_pipeline.glc_metadata.items():
+        write_curve_zip(os.path.join(raw_dir, os.path.basename(metadata["path"])),
+                        metadata["spreadsheets"], years, maturities)
+    write_curve_zip(os.path.join(raw_dir, os.path.basename(bank_liability_nominal_curve_pipeline.path_to_zip)),
+                    bank_liability_nominal_curve_pipeline.spreadsheets, years, maturities, first_year=1990)
+    write_ois_zip(os.path.join(raw_dir, os.path.basename(overnight_index_swap_pipeline.path_to_zip)),
+                  overnight_index_swap_pipeline.spreadsheets, years)
+    write_pdf_workbook(os.path.join(raw_dir, "ftse100pdfs.xlsx"),
+                       {"3 month constant maturity": 0.25, "6 month constant maturity": 0.5}, years)
+    write_pdf_workbook(os.path.join(raw_dir, "shortsterling_pdfs.xlsx"),
+                       {"3 month constant maturity": 0.25, "6 month constant maturity": 0.5,
+                        "12 month constant maturity": 1}, years)
+    write_hpi_workbook(os.path.join(raw_dir, "UK_House_price_index.xlsx"), years)
+    write_full_hpi_csv(os.path.join(raw_dir, "UK-HPI-full-file-2017-01.csv"), years, hpi_regions)
+    write_bank_rate_csv(os.path.join(raw_dir, "Bank Rate  Bank of England Database.csv"))
@@ -0,0 +1,121 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import loader
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+from instrumentation import stage
+from storage import publish_version, write_parquet
+
+
+COMBINED_PATH = "../processed_data/combined.parquet"
+PYRAMID_PATH = "../processed_data/pyramid"
+# Finest first; each level is resampled from the daily data.
+LEVELS = {"weekly": "W-FRI", "monthly": "ME", "quarterly": "QE"}
+STATISTICS = ["last", "mean", "min", "max"]
+# Kept alongside the statistics so means can be combined into coarser ones.
+COUNT = "count"
+# Long enough for every supported frequency to repeat many times.
+_NESTING_SPAN = ("2000-01-01", "2030-12-31")
+
+
+def _write_levels(daily, path):
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    for level, rule in LEVELS.items():
+        os.makedirs(os.path.join(tmp_path, level))
+        resampler = daily.resample(rule)
+        with stage(f"resample:{level}") as s:
+            counts = s.record(resampler.count())
+            kept = counts.to_numpy().any(axis=1)
+            frames = {statistic: getattr(resampler, statistic)()[kept] for statistic in STATISTICS}
+            frames[COUNT] = counts[kept]
+        with stage(f"write:{level}"):
+            for statistic, df in frames.items():
+                write_parquet(df, os.path.join(tmp_path, level, f"{statistic}.parquet"))
+        print(f"{level}: {kept.sum()} periods from {len(daily)} days")
+    os.replace(tmp_path, path)
+
+
+def build_pyramid(path_to_combined=COMBINED_PATH, root=PYRAMID_PATH):
+    """Write root/<level>/<statistic>.parquet for every level of the daily combined data.
+
+    Each file has the columns of combined.parquet, one row per period
+    labelled by its end. root is a symlink to the newest of the versioned
+    directories beside it, swapped by storage.publish_version, so queries
+    never see a partly written pyramid.
+    """
+    with stage("aggregate_pyramid"):
+        with stage("read") as s:
+            daily = s.record(pd.read_parquet(path_to_combined).select_dtypes("number"))
+        daily.index = pd.to_datetime(daily.index)
+        publish_version(os.path.dirname(root) or ".", os.path.basename(root),
+                        lambda path: _write_levels(daily, path))
+
+
+def _boundaries(freq):
+    return set(pd.date_range(*_NESTING_SPAN, freq=freq))
+
+
+def level_for(freq):
+    """The coarsest level whose periods nest exactly inside freq's, or None for daily and finer.
+
+    A level can answer freq when every freq period boundary is also one of
+    the level's, e.g. monthly answers quarterly and yearly queries but
+    weekly answers neither.
+    """
+    offset = to_offset(freq)
+    if isinstance(offset, Tick) and pd.Timedelta(offset) < pd.Timedelta(days=1):
+        # finer than the daily data, and too many boundaries to enumerate
+        return None
+    wanted = _boundaries(freq)
+    for level in reversed(LEVELS):
+        if wanted <= _boundaries(LEVELS[level]):
+            return level
+    return None
+
+
+def _read_level(level, statistic, columns, start, end, root):
+    filters = []
+    if start is not None:
+        filters.append(("date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date", "<=", pd.Timestamp(end)))
+    return pd.read_parquet(os.path.join(root, level, f"{statistic}.parquet"),
+                           columns=columns, filters=filters or None)
+
+
+def query(freq, how="mean", columns=None, start=None, end=None,
+          data_dir=loader.DATA_DIR, root=None):
+    """combined resampled to freq (e.g. "ME", "QE", "YE", "W-FRI") with statistic how.
+
+    Served from the coarsest pyramid level that nests inside freq, so a
+    yearly query over decades reads quarterly rows rather than days. Means
+    are recombined weighted by each period's count of observations, so the
+    result equals resampling the daily data. start and end select level
+    periods by their end date; with no compatible level, the daily data is
+    resampled.
+    """
+    if how not in STATISTICS:
+        raise ValueError(f"Unknown statistic {how}, expected one of {STATISTICS}")
+    root = root or os.path.join(data_dir, "pyramid")
+    level = level_for(freq)
+    if level is None:
+        daily = loader.load("combined", columns, start, end, data_dir=data_dir).select_dtypes("number")
+        return getattr(daily.resample(freq), how)().dropna(how="all")
+    if to_offset(freq) == to_offset(LEVELS[level]):
+        return _read_level(level, how, columns, start, end, root).dropna(how="all")
+
+    df = _read_level(level, how, columns, start, end, root)
+    if how != "mean":
+        return getattr(df.resample(freq), how)().dropna(how="all")
+    counts = _read_level(level, COUNT, columns, start, end, root)
+    totals = (df * counts).fillna(0).resample(freq).sum()
+    n = counts.resample(freq).sum()
+    return (totals / n.where(n > 0, np.nan)).dropna(how="all")
+
+
+if __name__ == "__main__":
+    build_pyramid()
+    print(os.path.basename(__file__), "done")
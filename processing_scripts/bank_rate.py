@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import loader
+
+
+def read_changes(data_dir=loader.DATA_DIR):
+    """The Bank Rate change points: one row per change, indexed by date."""
+    return loader.load("boe_rate_changes", data_dir=data_dir)
+
+
+def _as_datetime64(dates):
+    return pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(dates))).values.astype("datetime64[ns]")
+
+
+def as_of(dates, changes=None):
+    """Bank Rate in force on each of dates, and whether it changed that day.
+
+    One searchsorted over the change points answers every date at once.
+    Dates before the first change get a NaN rate. Returns a frame indexed
+    by dates with the same rate and changed columns as boe_rate.parquet.
+    """
+    if changes is None:
+        changes = read_changes()
+    change_dates = changes.index.values.astype("datetime64[ns]")
+    rates = changes["rate"].to_numpy(dtype=np.float64)
+    query = _as_datetime64(dates)
+
+    rate = np.full(len(query), np.nan)
+    changed = np.zeros(len(query), dtype=bool)
+    position = np.searchsorted(change_dates, query, side="right") - 1
+    known = position >= 0
+    rate[known] = rates[position[known]]
+    changed[known] = change_dates[position[known]] == query[known]
+    return pd.DataFrame({"rate": rate, "changed": changed},
+                        index=pd.DatetimeIndex(query, name="date"))
+
+
+def join(df, changes=None, rate="rate", changed="changed"):
+    """Return df with Bank Rate columns added for each date in its index.
+
+    Only the dates in df are looked up, so the daily grid is never built.
+    Pass changed=None to leave out the changed flag.
+    """
+    result = as_of(df.index, changes)
+    columns = {rate: result["rate"].to_numpy()}
+    if changed is not None:
+        columns[changed] = result["changed"].to_numpy()
+    return df.assign(**columns)
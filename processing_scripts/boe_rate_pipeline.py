@@ -1,20 +1,30 @@
 import os
 import pandas as pd
+from instrumentation import stage
+from storage import write_parquet
 
 
 def process():
     os.makedirs("../processed_data", exist_ok=True)
-    df = pd.read_csv("../raw_data/Bank Rate  Bank of England Database.csv")
-    df["changed"] = True
-    df.rename(columns={"Date Changed": "date", "Rate": "rate"}, inplace=True)
-    df["date"] = pd.to_datetime(df["date"], dayfirst=True)
-    df.sort_values(by="date", inplace=True)
-    df.set_index("date", inplace=True, drop=True)
-    df = df.reindex(pd.date_range(df.index[0], df.index[-1]))
-    df.index.name = "date"
-    df["rate"].ffill(inplace=True)
-    df["changed"].fillna(False, inplace=True)
-    df.to_parquet("../processed_data/boe_rate.parquet")
+    with stage("boe_rate_pipeline"):
+        with stage("read_csv") as s:
+            df = s.record(pd.read_csv("../raw_data/Bank Rate  Bank of England Database.csv"))
+        with stage("transform") as s:
+            df["changed"] = True
+            df.rename(columns={"Date Changed": "date", "Rate": "rate"}, inplace=True)
+            df["date"] = pd.to_datetime(df["date"], dayfirst=True)
+            df.sort_values(by="date", inplace=True)
+            df.set_index("date", inplace=True, drop=True)
+            changes = df[["rate"]]
+            df = df.reindex(pd.date_range(df.index[0], df.index[-1]))
+            df.index.name = "date"
+            df["rate"] = df["rate"].ffill()
+            df["changed"] = df["changed"].fillna(False).astype(bool)
+            s.record(df)
+        with stage("write"):
+            write_parquet(df, "../processed_data/boe_rate.parquet")
+        with stage("write_changes") as s:
+            write_parquet(s.record(changes), "../processed_data/boe_rate_changes.parquet")
 
 
 if __name__ == "__main__":
@@ -1,22 +1,56 @@
 import os
+import numpy as np
 import pandas as pd
-from functools import reduce
-
-
-def combine_data():
-    data = pd.DataFrame()
-    for file in os.listdir("../processed_data/"):
-        if file == "uk_full_hpi.parquet":
-            continue
-        print("data shape:", data.shape, f". Merging {file}")
-        df = (pd.read_parquet(f"../processed_data/{file}")
-              .drop_duplicates()
-              .dropna(how="all"))
-        if data.empty:
-            data = df.copy()
-        else:
-            data = data.merge(df, how="outer", left_index=True, right_index=True).drop_duplicates()
-    data.to_parquet("../processed_data/combined.parquet")
+from instrumentation import stage
+from storage import write_parquet, write_snapshot
+
+
+EXCLUDED_FILES = {"uk_full_hpi.parquet", "combined.parquet", "boe_rate_changes.parquet"}
+
+
+def _processed_files(directory):
+    return sorted(file for file in os.listdir(directory)
+                  if file.endswith(".parquet") and file not in EXCLUDED_FILES
+                  and os.path.isfile(os.path.join(directory, file)))
+
+
+def _union_index(indexes):
+    # Every index is already sorted, so a stable sort of their concatenation
+    # is a k-way merge of the runs; duplicates are then adjacent.
+    values = np.sort(np.concatenate([index.values.astype("datetime64[ns]") for index in indexes]),
+                     kind="stable")
+    if len(values):
+        values = values[np.concatenate([[True], values[1:] != values[:-1]])]
+    return pd.DatetimeIndex(values, name="date")
+
+
+def _read(directory, file):
+    df = pd.read_parquet(os.path.join(directory, file)).dropna(how="all")
+    df.index = pd.to_datetime(df.index)
+    if not df.index.is_unique:
+        # Curve files written before the pipelines resolved overlapping
+        # parts stack one sheet per block of rows.
+        df = df.groupby(level=0, sort=False).first()
+    return df.sort_index()
+
+
+def combine_data(directory="../processed_data"):
+    with stage("combine"):
+        dataframes = []
+        for file in _processed_files(directory):
+            with stage(f"read:{file}") as s:
+                df = s.record(_read(directory, file))
+            print(f"Read {file}:", df.shape)
+            dataframes.append(df)
+        with stage("union_index") as s:
+            index = s.record(_union_index([df.index for df in dataframes]))
+        with stage("concat") as s:
+            data = s.record(pd.concat([df.reindex(index) for df in dataframes], axis="columns"))
+        print("combined shape:", data.shape)
+        with stage("write"):
+            write_parquet(data, os.path.join(directory, "combined.parquet"))
+        with stage("write_snapshot"):
+            write_snapshot(data, directory, "combined")
 
 
 if __name__ == "__main__":
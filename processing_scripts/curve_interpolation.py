@@ -0,0 +1,187 @@
+import os
+import functools
+import numpy as np
+import pandas as pd
+import loader
+
+
+DATASET_FOR_PREFIX = {"glc_nom": "glc_nominal",
+                      "glc_real": "glc_real",
+                      "glc_infl": "glc_inflation",
+                      "blc_nom": "blc_nominal",
+                      "ois": "ois"}
+# Each GLC curve is split across a short-end sheet (months) and a long sheet (years).
+GLC_CURVES = {"spot": ["{}_spot_short_end", "{}_spot"],
+              "forward": ["{}_short_end", "{}_forward"]}
+METHODS = ("linear", "monotone_cubic")
+YEARS_PER_UNIT = {"month": 1 / 12, "year": 1.0}
+
+
+def _dataset_for(curve):
+    for prefix, dataset in DATASET_FOR_PREFIX.items():
+        if curve.startswith(prefix + "_"):
+            return dataset
+    raise KeyError(f"No dataset holds curve {curve}")
+
+
+def _fill_gaps(values, x):
+    # Linearly interpolate interior gaps along each row; leading and
+    # trailing gaps stay NaN, so queries beyond the quoted range are NaN.
+    filled = values.copy()
+    for row in np.flatnonzero(np.isnan(values).any(axis=1)):
+        valid = ~np.isnan(values[row])
+        if valid.sum() >= 2:
+            inside = (x >= x[valid][0]) & (x <= x[valid][-1])
+            filled[row, inside] = np.interp(x[inside], x[valid], values[row, valid])
+    return filled
+
+
+def _monotone_slopes(y, h, delta):
+    # Fritsch-Carlson node derivatives for every row at once: a weighted
+    # harmonic mean of neighbouring secants, zero at local extrema, and
+    # shape-preserving three-point estimates at the ends.
+    d = np.zeros_like(y)
+    s0, s1 = delta[:, :-1], delta[:, 1:]
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interior = (w1 + w2) / (w1 / s0 + w2 / s1)
+    d[:, 1:-1] = np.where(s0 * s1 > 0, interior, 0.0)
+
+    for end, (s_near, s_far, h_near, h_far) in ((0, (delta[:, 0], delta[:, 1], h[0], h[1])),
+                                                (-1, (delta[:, -1], delta[:, -2], h[-1], h[-2]))):
+        slope = ((2 * h_near + h_far) * s_near - h_near * s_far) / (h_near + h_far)
+        slope = np.where(np.sign(slope) != np.sign(s_near), 0.0, slope)
+        overshoot = (np.sign(s_near) != np.sign(s_far)) & (np.abs(slope) > 3 * np.abs(s_near))
+        d[:, end] = np.where(overshoot, 3 * s_near, slope)
+    return d
+
+
+class Curve:
+    """A yield curve on a date x maturity grid, with cached interpolants.
+
+    Maturities are in years. Coefficients for every date are computed once
+    per method on first use, as cubic polynomials per maturity interval
+    (the linear ones have zero higher-order terms), and interpolate()
+    evaluates any number of (date, maturity) pairs in one vectorized pass.
+    """
+
+    def __init__(self, name, dates, maturities, values):
+        order = np.argsort(maturities, kind="stable")
+        self.name = name
+        self.dates = pd.DatetimeIndex(dates).values.astype("datetime64[ns]")
+        self.maturities = np.asarray(maturities, dtype=np.float64)[order]
+        self.values = np.asarray(values, dtype=np.float64)[:, order]
+        self._coefficients = {}
+
+    @classmethod
+    def from_frame(cls, df, curves):
+        """Build from a wide frame with {curve}_{month|year}_{maturity} columns.
+
+        When two of the curves quote the same maturity the first one wins.
+        Repeated dates are collapsed to their first non-missing values.
+        """
+        columns, maturities = [], []
+        for curve in curves:
+            for column in df.columns:
+                parts = column.rsplit("_", 2)
+                if len(parts) != 3 or parts[0] != curve or parts[1] not in YEARS_PER_UNIT:
+                    continue
+                years = float(parts[2]) * YEARS_PER_UNIT[parts[1]]
+                if not np.isclose(maturities, years).any():
+                    columns.append(column)
+                    maturities.append(years)
+        if not columns:
+            raise KeyError(f"No columns for {curves}")
+        df = df[columns]
+        df.index = pd.to_datetime(df.index)
+        if not df.index.is_unique:
+            df = df.groupby(level=0).first()
+        df = df.sort_index().dropna(how="all")
+        return cls("+".join(curves), df.index, maturities, df.to_numpy(dtype=np.float64))
+
+    def coefficients(self, method="linear"):
+        """Per-date, per-interval polynomial coefficients, shape (dates, intervals, 4)."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method}, expected one of {METHODS}")
+        if method not in self._coefficients:
+            x = self.maturities
+            y = _fill_gaps(self.values, x)
+            h = np.diff(x)
+            delta = np.diff(y, axis=1) / h
+            coefficients = np.zeros(y.shape[:1] + (len(h), 4))
+            coefficients[:, :, 0] = y[:, :-1]
+            if method == "linear" or len(x) < 3:
+                coefficients[:, :, 1] = delta
+            else:
+                d = _monotone_slopes(y, h, delta)
+                coefficients[:, :, 1] = d[:, :-1]
+                coefficients[:, :, 2] = (3 * delta - 2 * d[:, :-1] - d[:, 1:]) / h
+                coefficients[:, :, 3] = (d[:, :-1] + d[:, 1:] - 2 * delta) / h ** 2
+            self._coefficients[method] = coefficients
+        return self._coefficients[method]
+
+    def _rows(self, dates, asof):
+        query = pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(dates))).values.astype("datetime64[ns]")
+        if asof:
+            rows = np.searchsorted(self.dates, query, side="right") - 1
+            return rows, rows >= 0
+        rows = np.searchsorted(self.dates, query)
+        rows = np.clip(rows, 0, len(self.dates) - 1)
+        return rows, self.dates[rows] == query
+
+    def interpolate(self, dates, maturities, method="linear", asof=False):
+        """Rates at each (date, maturity in years) pair; the two arrays broadcast.
+
+        Dates missing from the curve give NaN, or with asof=True the last
+        curve on or before them. Maturities outside the quoted range give NaN.
+        """
+        dates, maturities = np.broadcast_arrays(np.atleast_1d(np.asarray(dates)),
+                                                np.atleast_1d(np.asarray(maturities, dtype=np.float64)))
+        shape = dates.shape
+        rows, found = self._rows(dates.ravel(), asof)
+        m = maturities.ravel()
+        x = self.maturities
+        interval = np.clip(np.searchsorted(x, m, side="right") - 1, 0, len(x) - 2)
+        c = self.coefficients(method)[np.where(found, rows, 0), interval]
+        t = m - x[interval]
+        result = c[:, 0] + t * (c[:, 1] + t * (c[:, 2] + t * c[:, 3]))
+        result[~found | (m < x[0]) | (m > x[-1])] = np.nan
+        return result.reshape(shape)
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_curve(curves, dataset, data_dir, mtime_ns, size):
+    # Keyed on the file's mtime and size, like loader's schema cache.
+    handle = loader.open_dataset(dataset, data_dir)
+    columns = [column for column in handle.columns if column.rsplit("_", 2)[0] in curves]
+    return Curve.from_frame(handle.select(columns).to_pandas(), curves)
+
+
+def load_curve(curves, data_dir=loader.DATA_DIR):
+    """Load one curve, e.g. "ois_spot", or several stitched by maturity.
+
+    The result is cached until the underlying parquet file changes.
+    """
+    curves = (curves,) if isinstance(curves, str) else tuple(curves)
+    datasets = {_dataset_for(curve) for curve in curves}
+    if len(datasets) > 1:
+        raise ValueError(f"Curves {curves} come from different datasets {sorted(datasets)}")
+    dataset = datasets.pop()
+    stat = os.stat(os.path.join(data_dir, loader.DATASETS[dataset]))
+    return _cached_curve(curves, dataset, data_dir, stat.st_mtime_ns, stat.st_size)
+
+
+def glc_curve(kind="spot", measure="nom", data_dir=loader.DATA_DIR):
+    """The full GLC curve, short end and long end, for measure nom, real or infl."""
+    if kind not in GLC_CURVES:
+        raise ValueError(f"Unknown kind {kind}, expected one of {sorted(GLC_CURVES)}")
+    return load_curve([name.format(f"glc_{measure}") for name in GLC_CURVES[kind]], data_dir)
+
+
+def breakeven(dates, maturities, kind="spot", method="linear", asof=False, data_dir=loader.DATA_DIR):
+    """Breakeven inflation, GLC nominal minus real, at each (date, maturity) pair."""
+    nominal = glc_curve(kind, "nom", data_dir)
+    real = glc_curve(kind, "real", data_dir)
+    return (nominal.interpolate(dates, maturities, method, asof)
+            - real.interpolate(dates, maturities, method, asof))
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+CURVE_FILES = {
+    "glc_nominal": "../processed_data/glc_nominal.parquet",
+    "glc_real": "../processed_data/glc_real.parquet",
+    "glc_inflation": "../processed_data/glc_inflation.parquet",
+    "blc_nominal": "../processed_data/bank_liability_curve_nominal.parquet",
+    "ois": "../processed_data/ois.parquet",
+}
+STORE_PATH = "../processed_data/curves"
+ROW_GROUP_SIZE = 32_768
+
+_SCHEMA = pa.schema([("date", pa.timestamp("us")),
+                     ("curve", pa.string()),
+                     ("tenor_unit", pa.string()),
+                     ("maturity", pa.float64()),
+                     ("value", pa.float64()),
+                     ("year", pa.int32())])
+
+
+def to_long(df):
+    """Melt a wide {curve}_{month|year}_{maturity} frame into tidy rows.
+
+    Returns (date, curve, tenor_unit, maturity, value, year) for every
+    non-missing value, sorted by year, curve, tenor unit, maturity and date.
+    """
+    names = [column.rsplit("_", 2) for column in df.columns]
+    curves, curve_codes = np.unique([name[0] for name in names], return_inverse=True)
+    units, unit_codes = np.unique([name[1] for name in names], return_inverse=True)
+    maturities = np.array([float(name[2]) for name in names])
+
+    values = df.to_numpy(dtype=np.float64)
+    rows, cols = np.nonzero(~np.isnan(values))
+    dates = pd.to_datetime(df.index).values.astype("datetime64[us]")[rows]
+    years = dates.astype("datetime64[Y]").astype(np.int32) + 1970
+    order = np.lexsort((dates, maturities[cols], unit_codes[cols], curve_codes[cols], years))
+    rows, cols, dates, years = rows[order], cols[order], dates[order], years[order]
+    return pa.Table.from_arrays([pa.array(dates),
+                                 pa.array(curves[curve_codes[cols]]),
+                                 pa.array(units[unit_codes[cols]]),
+                                 pa.array(maturities[cols]),
+                                 pa.array(values[rows, cols]),
+                                 pa.array(years)],
+                                schema=_SCHEMA)
+
+
+def write_curve_store(df, source, root=STORE_PATH):
+    """Write one wide curve frame under root/source=<source>/year=<year>/."""
+    ds.write_dataset(to_long(df), os.path.join(root, f"source={source}"),
+                     format="parquet",
+                     partitioning=ds.partitioning(pa.schema([("year", pa.int32())]), flavor="hive"),
+                     basename_template="part-{i}.parquet",
+                     existing_data_behavior="delete_matching",
+                     min_rows_per_group=ROW_GROUP_SIZE,
+                     max_rows_per_group=ROW_GROUP_SIZE,
+                     preserve_order=True)
+
+
+def read_curve(curve, start=None, end=None, maturities=None, tenor_unit=None,
+               wide=False, root=STORE_PATH):
+    """Read one curve (e.g. 'glc_nom_spot', 'ois_forward') from the store.
+
+    Year partitions outside [start, end] are never opened and row groups are
+    skipped on their curve/maturity/date statistics. Returns tidy rows, or a
+    date x maturity frame with wide=True.
+    """
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    condition = ds.field("curve") == curve
+    if start is not None:
+        start = pd.Timestamp(start)
+        condition &= (ds.field("year") >= start.year) & (ds.field("date") >= start)
+    if end is not None:
+        end = pd.Timestamp(end)
+        condition &= (ds.field("year") <= end.year) & (ds.field("date") <= end)
+    if maturities is not None:
+        condition &= ds.field("maturity").isin([float(m) for m in maturities])
+    if tenor_unit is not None:
+        condition &= ds.field("tenor_unit") == tenor_unit
+    columns = ["date", "tenor_unit", "maturity", "value"]
+    df = dataset.to_table(columns=columns, filter=condition).to_pandas()
+    df = df.sort_values(["date", "tenor_unit", "maturity"], ignore_index=True)
+    if wide:
+        return df.pivot_table(index="date", columns=["tenor_unit", "maturity"], values="value")
+    return df
+
+
+def build_curve_store(root=STORE_PATH):
+    for source, path in CURVE_FILES.items():
+        if os.path.exists(path):
+            write_curve_store(pd.read_parquet(path), source, root)
+            print(os.path.basename(path), "->", os.path.join(root, f"source={source}"))
+
+
+if __name__ == "__main__":
+    build_curve_store()
+    print(os.path.basename(__file__), "done")
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from dedup import resolve
+
+
+PERIOD_MARKERS = {"months:": "month", "years:": "year"}
+
+
+def _as_array(rows):
+    if isinstance(rows, pd.DataFrame):
+        return rows.to_numpy(dtype=object)
+    return np.array(rows, dtype=object).reshape(len(rows), -1)
+
+
+def _split_part(rows, labels):
+    values = _as_array(rows)
+    present = ~pd.isna(values)
+    if labels == "header":
+        keep_cols = present.any(axis=0)
+        values, present = values[:, keep_cols], present[:, keep_cols]
+    values = values[present.sum(axis=1) >= values.shape[1] - 1]
+    header = values[0]
+    if labels == "header":
+        markers = [i for i, value in enumerate(header) if value in PERIOD_MARKERS]
+        if not markers:
+            raise ValueError("No 'months:' or 'years:' header found")
+        date_col = markers[0]
+        period_type = PERIOD_MARKERS[header[date_col]]
+    else:
+        date_col = 0
+        period_type = "month"
+    value_cols = np.flatnonzero(np.arange(values.shape[1]) != date_col)
+    if labels == "header":
+        maturities = np.round(header[value_cols].astype(np.float64), 2)
+        names = pd.Index(maturities).astype(str).str.replace(r"\.0$", "", regex=True)
+    else:
+        names = pd.Index(value_cols).astype(str)
+    return values[2:], date_col, value_cols, period_type + "_" + names
+
+
+def curve_frame(parts, var, labels="header", precedence="newest"):
+    """Stack every part of one curve sheet into a single float64 frame.
+
+    parts are raw sheets (row lists or positional DataFrames), oldest
+    first. Columns are named {var}_{month|year}_{maturity}; with
+    labels="header" the maturity and period type come from the sheet's
+    'months:'/'years:' header row, with labels="position" from the column
+    position (the OIS layout). The result is filled into one preallocated
+    matrix, indexed by date. Dates covered by more than one part are
+    resolved by dedup.resolve with the given precedence, and dates whose
+    parts disagree are reported.
+    """
+    split = [_split_part(rows, labels) for rows in parts]
+    columns = pd.Index(list(dict.fromkeys(name for *_, names in split for name in names)))
+    n_rows = sum(len(values) for values, *_ in split)
+    out = np.full((n_rows, len(columns)), np.nan)
+    dates = np.empty(n_rows, dtype=object)
+    offset = 0
+    for values, date_col, value_cols, names in split:
+        rows = slice(offset, offset + len(values))
+        dates[rows] = values[:, date_col]
+        out[rows, columns.get_indexer(names)] = values[:, value_cols].astype(np.float64)
+        offset += len(values)
+    index = pd.DatetimeIndex(pd.to_datetime(dates), name="date")
+    df = pd.DataFrame(out, index=index, columns=f"{var}_" + columns, copy=False)
+    if index.is_unique:
+        return df
+    source = np.repeat(np.arange(len(split)), [len(values) for values, *_ in split])
+    df, conflicts = resolve(df, source, precedence)
+    if len(conflicts):
+        print(f"{var}: {len(conflicts)} dates differ between parts"
+              f" ({conflicts.index[0].date()} to {conflicts.index[-1].date()}), kept the {precedence}")
+    return df
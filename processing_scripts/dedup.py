@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+
+PRECEDENCES = ("newest", "oldest")
+
+
+def row_hashes(df):
+    """A uint64 hash of each row's values, ignoring the index."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def resolve(df, source, precedence="newest"):
+    """Keep one row per date, choosing between sources by precedence.
+
+    source gives each row's source as an ordinal, higher meaning newer
+    (e.g. the position of its workbook in the zip's spreadsheet list).
+    Rows are hashed once, so dates whose duplicate rows are identical are
+    told apart from conflicting ones without comparing values. Returns the
+    frame sorted by a unique date index, and a frame of the conflicting
+    dates with how many rows each had and the source that was kept.
+    """
+    if precedence not in PRECEDENCES:
+        raise ValueError(f"Unknown precedence {precedence}, expected one of {PRECEDENCES}")
+    source = np.asarray(source)
+    dates = df.index.values
+    rank = -source if precedence == "newest" else source
+    order = np.lexsort((rank, dates))
+    sorted_dates = dates[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_dates[1:] != sorted_dates[:-1]]))
+    counts = np.diff(np.append(starts, len(order)))
+
+    hashes = row_hashes(df)[order]
+    conflict = (counts > 1) & (np.minimum.reduceat(hashes, starts) != np.maximum.reduceat(hashes, starts))
+    kept = order[starts]
+    conflicts = pd.DataFrame({"rows": counts[conflict], "kept_source": source[kept[conflict]]},
+                             index=pd.DatetimeIndex(sorted_dates[starts[conflict]], name=df.index.name))
+    return df.iloc[kept], conflicts
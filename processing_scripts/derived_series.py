@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import pandas as pd
+import pyarrow.parquet as pq
+import loader
+from curve_interpolation import GLC_CURVES, YEARS_PER_UNIT
+from instrumentation import stage
+from storage import write_parquet
+
+
+PROCESSED = "../processed_data"
+DERIVED_DIR = "../processed_data/derived"
+STATE_KEY = b"derived_from"
+# Each series is computed by its kind from the named upstream datasets.
+# difference subtracts two curves at the maturities both quote;
+# rolling_std is the rolling standard deviation of daily changes over a
+# time window; year_on_year is the percentage change on a year earlier.
+SERIES = {
+    "breakeven_spot": {"kind": "difference",
+                       "left": ("glc_nominal", [name.format("glc_nom") for name in GLC_CURVES["spot"]]),
+                       "right": ("glc_real", [name.format("glc_real") for name in GLC_CURVES["spot"]])},
+    "ois_glc_spread": {"kind": "difference",
+                       "left": ("ois", ["ois_spot"]),
+                       "right": ("glc_nominal", [name.format("glc_nom") for name in GLC_CURVES["spot"]])},
+    "ftse100_implied_vol_std": {"kind": "rolling_std", "dataset": "ftse100_pdfs",
+                                "match": "_implied_vol_", "window": "30D"},
+    "hpi_yoy": {"kind": "year_on_year", "dataset": "uk_house_price_index", "match": ""},
+}
+# Room for the change into the first day of a rolling window.
+PREVIOUS_OBSERVATION = pd.Timedelta(days=10)
+
+
+def _maturity_columns(columns, curves):
+    # maturity in years -> column, the first curve winning, as in Curve.from_frame
+    found = {}
+    for curve in curves:
+        for column in columns:
+            parts = column.rsplit("_", 2)
+            if len(parts) == 3 and parts[0] == curve and parts[1] in YEARS_PER_UNIT:
+                found.setdefault(round(float(parts[2]) * YEARS_PER_UNIT[parts[1]], 6), column)
+    return found
+
+
+def _upstream(spec):
+    if spec["kind"] == "difference":
+        return [spec["left"][0], spec["right"][0]]
+    return [spec["dataset"]]
+
+
+def _inputs(spec, data_dir):
+    """{dataset: columns} read by a series."""
+    if spec["kind"] == "difference":
+        return {dataset: [column for column in loader.open_dataset(dataset, data_dir).columns
+                          if column.rsplit("_", 2)[0] in curves]
+                for dataset, curves in (spec["left"], spec["right"])}
+    columns = loader.open_dataset(spec["dataset"], data_dir).columns
+    return {spec["dataset"]: [column for column in columns if spec["match"] in column]}
+
+
+def _lookback(spec):
+    if spec["kind"] == "rolling_std":
+        return pd.Timedelta(spec["window"]) + PREVIOUS_OBSERVATION
+    if spec["kind"] == "year_on_year":
+        return pd.DateOffset(years=1)
+    return pd.Timedelta(0)
+
+
+def _difference(spec, frames):
+    (left_dataset, left_curves), (right_dataset, right_curves) = spec["left"], spec["right"]
+    left, right = frames[left_dataset], frames[right_dataset]
+    left_columns = _maturity_columns(left.columns, left_curves)
+    right_columns = _maturity_columns(right.columns, right_curves)
+    index = left.index.intersection(right.index)
+    out = {}
+    for maturity in sorted(set(left_columns) & set(right_columns)):
+        # named by the left curve's tenor, e.g. year_5
+        label = "_".join(left_columns[maturity].rsplit("_", 2)[1:])
+        out[label] = (left.loc[index, left_columns[maturity]].astype(float)
+                      - right.loc[index, right_columns[maturity]].astype(float))
+    return pd.DataFrame(out, index=index).dropna(how="all")
+
+
+def _rolling_std(spec, frames):
+    df = frames[spec["dataset"]].astype(float).sort_index()
+    return df.diff().rolling(spec["window"], min_periods=2).std().dropna(how="all")
+
+
+def _year_on_year(spec, frames):
+    df = frames[spec["dataset"]].astype(float).sort_index()
+    year_earlier = df.shift(freq=pd.DateOffset(years=1)).reindex(df.index)
+    return ((df / year_earlier - 1) * 100).dropna(how="all")
+
+
+KINDS = {"difference": _difference, "rolling_std": _rolling_std, "year_on_year": _year_on_year}
+
+
+def _fingerprints(datasets, data_dir):
+    fingerprints = {}
+    for dataset in datasets:
+        stat = os.stat(os.path.join(data_dir, loader.DATASETS[dataset]))
+        fingerprints[dataset] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprints
+
+
+def _stored_state(path):
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    if STATE_KEY not in metadata:
+        return None
+    return json.loads(metadata[STATE_KEY])
+
+
+def refresh(name, data_dir=PROCESSED, out_dir=DERIVED_DIR, full=False):
+    """Bring one derived series up to date with its upstream datasets.
+
+    When only upstream appends have happened, just the dates after the last
+    stored one are computed, from the inputs read back as far as the
+    series' lookback (its rolling window, or a year for year_on_year).
+    A changed definition, or full=True, recomputes the whole series.
+    """
+    spec = SERIES[name]
+    definition = json.dumps(spec, sort_keys=True)
+    path = os.path.join(out_dir, f"{name}.parquet")
+    with stage(f"derived:{name}"):
+        inputs = _inputs(spec, data_dir)
+        fingerprints = _fingerprints(inputs, data_dir)
+        stored = _stored_state(path)
+        if not full and stored is not None and stored["definition"] != definition:
+            full = True
+        if not full and stored is not None and stored["inputs"] == fingerprints:
+            print(f"{name}: up to date")
+            return
+
+        last = None
+        if not full and stored is not None:
+            dates = pq.read_table(path, columns=["date"]).column("date").to_pandas()
+            last = dates.max() if len(dates) else None
+        start = None if last is None else last - _lookback(spec)
+        with stage("read") as s:
+            frames = {dataset: s.record(loader.load(dataset, columns, start=start, data_dir=data_dir))
+                      for dataset, columns in inputs.items()}
+        with stage("compute") as s:
+            df = s.record(KINDS[spec["kind"]](spec, frames))
+        df.index = pd.DatetimeIndex(df.index, name="date")
+        if last is not None:
+            new = df[df.index > last]
+            df = pd.concat([pd.read_parquet(path), new]).sort_index()
+            print(f"{name}: appended {len(new)} dates after {last.date()}")
+        else:
+            print(f"{name}: computed {len(df)} dates")
+        os.makedirs(out_dir, exist_ok=True)
+        with stage("write"):
+            write_parquet(df, path, metadata={STATE_KEY: json.dumps({"definition": definition,
+                                                                     "inputs": fingerprints})})
+
+
+def process(names=None, full=False):
+    with stage("derived_series"):
+        for name in names or SERIES:
+            missing = [dataset for dataset in _upstream(SERIES[name])
+                       if not os.path.exists(os.path.join(PROCESSED, loader.DATASETS[dataset]))]
+            if missing:
+                print(f"{name}: skipped, missing {missing}")
+                continue
+            refresh(name, full=full)
+
+
+if __name__ == "__main__":
+    process(full="--full" in sys.argv)
+    print(os.path.basename(__file__), "done")
@@ -0,0 +1,379 @@
+import os
+import ssl
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+import functools
+from urllib.parse import quote, urljoin, urlsplit
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+
+RAW = "../raw_data"
+STATE_FILE = ".fetch_state.json"
+BOE_YIELD_CURVES = "https://www.bankofengland.co.uk/-/media/boe/files/statistics/yield-curves"
+LAND_REGISTRY_HPI = "https://publicdata.landregistry.gov.uk/market-trend-data/house-price-index-data"
+
+# url None: no stable download link, so the file is placed in raw_data by
+# hand (or fetched from a mirror with --base-url). Add "sha256" to pin a
+# source whose contents must not change.
+SOURCES = {
+    "glcnominalddata.zip": {"url": f"{BOE_YIELD_CURVES}/glcnominalddata.zip"},
+    "glcrealddata.zip": {"url": f"{BOE_YIELD_CURVES}/glcrealddata.zip"},
+    "glcinflationddata.zip": {"url": f"{BOE_YIELD_CURVES}/glcinflationddata.zip"},
+    "blcnomddata.zip": {"url": f"{BOE_YIELD_CURVES}/blcnomddata.zip"},
+    "oisddata.zip": {"url": f"{BOE_YIELD_CURVES}/oisddata.zip"},
+    "UK-HPI-full-file-2017-01.csv": {"url": f"{LAND_REGISTRY_HPI}/UK-HPI-full-file-2017-01.csv"},
+    "ftse100pdfs.xlsx": {"url": None},
+    "shortsterling_pdfs.xlsx": {"url": None},
+    "UK_House_price_index.xlsx": {"url": None},
+    "Bank Rate  Bank of England Database.csv": {"url": None},
+}
+CHUNK_SIZE = 1 << 16
+MAX_REDIRECTS = 5
+CONNECTIONS_PER_HOST = 4
+# Seconds to wait for a connection, or for the next bytes on one.
+TIMEOUT = 60
+USER_AGENT = "uk-economic-data-fetch/1.0"
+
+
+class FetchError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections, at most per_host open to each origin."""
+
+    def __init__(self, per_host=CONNECTIONS_PER_HOST, timeout=TIMEOUT):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.opened = 0
+        self.reused = 0
+        self.retried = 0
+        self._idle = {}
+        self._slots = {}
+        self._ssl = ssl.create_default_context()
+
+    async def acquire(self, scheme, host, port, fresh=False):
+        """Returns (key, reader, writer, reused); fresh skips the idle connections."""
+        key = (scheme, host, port)
+        await self._slots.setdefault(key, asyncio.Semaphore(self.per_host)).acquire()
+        idle = self._idle.setdefault(key, [])
+        while idle and not fresh:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                self.reused += 1
+                return key, reader, writer, True
+            writer.close()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                host, port, ssl=self._ssl if scheme == "https" else None), self.timeout)
+        except BaseException:
+            self._slots[key].release()
+            raise
+        self.opened += 1
+        return key, reader, writer, False
+
+    def stats(self):
+        return {"connections_opened": self.opened, "connections_reused": self.reused,
+                "stale_retries": self.retried}
+
+    def release(self, key, reader, writer, reusable):
+        if reusable:
+            self._idle[key].append((reader, writer))
+        else:
+            writer.close()
+        self._slots[key].release()
+
+    async def close(self):
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+
+async def _read_head(reader, timeout):
+    status_line = await asyncio.wait_for(reader.readline(), timeout)
+    if not status_line:
+        raise FetchError("connection closed before a response")
+    version, status, *_ = status_line.decode("latin-1").strip().split(" ", 2) + [""]
+    if not status.isdigit():
+        raise FetchError(f"malformed status line {status_line[:80]!r}")
+    headers = {}
+    while True:
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return version, int(status), headers
+
+
+async def _body(reader, headers, timeout):
+    """Yield the body in chunks; the connection is reusable if it was delimited."""
+    def within(awaitable):
+        return asyncio.wait_for(awaitable, timeout)
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            line = await within(reader.readline())
+            try:
+                size = int(line.split(b";")[0], 16)
+            except ValueError:
+                raise FetchError(f"malformed chunk size {line[:80]!r}") from None
+            if size == 0:
+                while (await within(reader.readline())) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            while size:
+                chunk = await within(reader.read(min(size, CHUNK_SIZE)))
+                if not chunk:
+                    raise FetchError("connection closed mid-chunk")
+                size -= len(chunk)
+                yield chunk
+            await within(reader.readline())
+    elif "content-length" in headers:
+        if not headers["content-length"].isdigit():
+            raise FetchError(f"malformed Content-Length {headers['content-length']!r}")
+        remaining = int(headers["content-length"])
+        while remaining:
+            chunk = await within(reader.read(min(remaining, CHUNK_SIZE)))
+            if not chunk:
+                raise FetchError(f"connection closed with {remaining} bytes outstanding")
+            remaining -= len(chunk)
+            yield chunk
+    else:
+        while chunk := await within(reader.read(CHUNK_SIZE)):
+            yield chunk
+
+
+def _keep_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close" and ("content-length" in headers
+                                      or headers.get("transfer-encoding", "").lower() == "chunked")
+
+
+def _conditional_headers(entry, path, force):
+    # Only trust the validators while the local file is the one they describe.
+    if force or not entry or not os.path.exists(path):
+        return {}
+    stat = os.stat(path)
+    if (stat.st_size, stat.st_mtime_ns) != (entry.get("size"), entry.get("mtime_ns")):
+        return {}
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _get(pool, name, url, raw_dir, entry, sha256, force):
+    path = os.path.join(raw_dir, name)
+    extra = _conditional_headers(entry, path, force)
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        lines = [f"GET {target} HTTP/1.1", f"Host: {parts.netloc}", f"User-Agent: {USER_AGENT}",
+                 "Accept-Encoding: identity", "Connection: keep-alive"]
+        lines += [f"{header}: {value}" for header, value in extra.items()]
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        for attempt in range(2):
+            key, reader, writer, reused = await pool.acquire(parts.scheme, parts.hostname, port,
+                                                             fresh=attempt > 0)
+            try:
+                writer.write(request)
+                await asyncio.wait_for(writer.drain(), pool.timeout)
+                version, status, headers = await _read_head(reader, pool.timeout)
+                break
+            except BaseException as e:
+                # The slot and connection go back whatever the failure. A
+                # kept-alive connection the server has since closed fails
+                # before any response; that one is retried on a new connection.
+                pool.release(key, reader, writer, False)
+                if not isinstance(e, (OSError, FetchError)) or not reused or attempt:
+                    raise
+                pool.retried += 1
+
+        reusable = False
+        try:
+            if status == 304:
+                reusable = _keep_alive(version, {**headers, "content-length": "0"})
+                return "unchanged", entry
+            if status in (301, 302, 303, 307, 308) and "location" in headers:
+                async for _ in _body(reader, headers, pool.timeout):
+                    pass
+                reusable = _keep_alive(version, headers)
+                url = urljoin(url, headers["location"])
+                continue
+            if status != 200:
+                raise FetchError(f"{name}: HTTP {status} from {url}")
+
+            digest = hashlib.sha256()
+            size = 0
+            tmp_path = os.path.join(raw_dir, f".{name}.part")
+            try:
+                with open(tmp_path, "wb") as f:
+                    async for chunk in _body(reader, headers, pool.timeout):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        f.write(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+                reusable = _keep_alive(version, headers)
+                if "content-length" in headers and size != int(headers["content-length"]):
+                    raise FetchError(f"{name}: got {size} bytes, Content-Length was {headers['content-length']}")
+                if sha256 and digest.hexdigest() != sha256:
+                    raise FetchError(f"{name}: sha256 {digest.hexdigest()} does not match {sha256}")
+                if (entry and entry.get("etag") and headers.get("etag") == entry["etag"]
+                        and entry.get("sha256") and digest.hexdigest() != entry["sha256"]):
+                    raise FetchError(f"{name}: contents changed but ETag {entry['etag']} did not")
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            stat = os.stat(path)
+            return "downloaded", {"url": url, "etag": headers.get("etag"),
+                                  "last_modified": headers.get("last-modified"),
+                                  "sha256": digest.hexdigest(), "size": size,
+                                  "mtime_ns": stat.st_mtime_ns}
+        finally:
+            pool.release(key, reader, writer, reusable)
+    raise FetchError(f"{name}: more than {MAX_REDIRECTS} redirects")
+
+
+async def fetch(pool, name, url, raw_dir, entry=None, sha256=None, force=False):
+    """Download url into raw_dir/name unless the server reports it unchanged.
+
+    The body is streamed to a temporary file beside the target, checked
+    against Content-Length, hashed, checked against sha256 when one is
+    pinned and against the recorded sha256 when the ETag is unchanged, and
+    moved into place with os.replace. On a 304 the local file is hashed
+    and, if it no longer matches the recorded sha256, downloaded again.
+    Returns (status, new state entry).
+    """
+    status, new_entry = await _get(pool, name, url, raw_dir, entry, sha256, force)
+    if status == "unchanged" and entry and entry.get("sha256"):
+        local = await asyncio.to_thread(_file_sha256, os.path.join(raw_dir, name))
+        if local != entry["sha256"]:
+            print(f"{name}: local copy does not match its recorded sha256, downloading again")
+            status, new_entry = await _get(pool, name, url, raw_dir, None, sha256, True)
+    return status, new_entry
+
+
+def _load_state(raw_dir):
+    path = os.path.join(raw_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(raw_dir, state):
+    path = os.path.join(raw_dir, STATE_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+async def fetch_all(names=None, raw_dir=RAW, base_url=None, force=False,
+                    per_host=CONNECTIONS_PER_HOST, timeout=TIMEOUT):
+    """Fetch the named SOURCES (default: all) concurrently over pooled connections.
+
+    base_url replaces every source's URL with base_url/<file name>, e.g. a
+    mirror started with --serve. timeout bounds every wait on the network,
+    in seconds. Returns ({name: status}, connection stats),
+    where status is downloaded, unchanged, manual (no URL) or the error
+    message.
+    """
+    os.makedirs(raw_dir, exist_ok=True)
+    state = _load_state(raw_dir)
+    pool = ConnectionPool(per_host, timeout)
+    results = {}
+
+    async def one(name):
+        source = SOURCES[name]
+        url = f"{base_url.rstrip('/')}/{quote(name)}" if base_url else source["url"]
+        if url is None:
+            results[name] = "manual"
+            return
+        try:
+            results[name], entry = await fetch(pool, name, url, raw_dir, state.get(name),
+                                               source.get("sha256"), force)
+            state[name] = entry
+        except (OSError, FetchError, ValueError) as e:
+            results[name] = f"failed: {str(e) or type(e).__name__}"
+
+    try:
+        await asyncio.gather(*(one(name) for name in names or SOURCES))
+    finally:
+        await pool.close()
+        _save_state(raw_dir, state)
+    return results, pool.stats()
+
+
+class MirrorHandler(SimpleHTTPRequestHandler):
+    """Serves a raw_data directory over keep-alive HTTP/1.1 with ETag and Last-Modified."""
+
+    protocol_version = "HTTP/1.1"
+
+    def send_head(self):
+        self._etag = None
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            self._etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            if self.headers.get("If-None-Match") == self._etag:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def end_headers(self):
+        if getattr(self, "_etag", None):
+            self.send_header("ETag", self._etag)
+        super().end_headers()
+
+
+def serve_mirror(directory=RAW, host="127.0.0.1", port=8000):
+    server = ThreadingHTTPServer((host, port), functools.partial(MirrorHandler, directory=directory))
+    print(f"serving {os.path.abspath(directory)} on http://{host}:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the raw data files into ../raw_data")
+    parser.add_argument("names", nargs="*", help=f"files to fetch (default: all of {', '.join(SOURCES)})")
+    parser.add_argument("--base-url", help="fetch every file from this mirror instead")
+    parser.add_argument("--force", action="store_true", help="skip the conditional request")
+    parser.add_argument("--serve", metavar="DIR", help="serve DIR as a mirror instead of fetching")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--timeout", type=float, default=TIMEOUT,
+                        help="seconds to wait for a connection or for data")
+    args = parser.parse_args()
+    if args.serve:
+        serve_mirror(args.serve, port=args.port)
+        sys.exit(0)
+    unknown = set(args.names) - set(SOURCES)
+    if unknown:
+        parser.error(f"unknown files {sorted(unknown)}")
+    results, stats = asyncio.run(fetch_all(args.names, base_url=args.base_url, force=args.force,
+                                                timeout=args.timeout))
+    for name, status in results.items():
+        print(f"{name}: {status}")
+    print(", ".join(f"{key.replace('_', ' ')}: {value}" for key, value in stats.items()))
+    sys.exit(1 if any(status.startswith("failed") for status in results.values()) else 0)
@@ -1,9 +1,10 @@
 import os
-import re
-import numpy as np
+import sys
 import pandas as pd
-from zipfile import ZipFile
-from openpyxl import load_workbook
+from spreadsheets import read_spreadsheets
+from curve_transform import curve_frame
+from incremental import refresh
+from instrumentation import stage
 
 
 glc_metadata = {
@@ -71,65 +72,43 @@ glc_metadata = {
 }
 
 
-def _process_spreadsheet(path_to_zip, filename):
-    data = {}
-    with ZipFile(path_to_zip, "r") as zf:
-        with zf.open(filename, "r") as f:
-            wb = load_workbook(filename=f, read_only=True, data_only=True)
-            sheetnames = [name for name in wb.sheetnames if re.match("\d\.", name)]
-            for sheet in sheetnames:
-                data[sheet] = [
-                    [cell.value for cell in row] for row in wb[sheet].iter_rows(
-                        min_row=1, min_col=1, max_row=wb[sheet].max_row, max_col=wb[sheet].max_column
-                    )
-                ]
-    return data
+def read_glc_data(data_type, workers=None, engine=None, spreadsheets=None):
+    return read_spreadsheets(glc_metadata[data_type]["path"],
+                             spreadsheets or glc_metadata[data_type]["spreadsheets"],
+                             workers=workers, engine=engine)
 
 
-def read_glc_data(data_type):
-    data = {}
-    path = glc_metadata[data_type]["path"]
-    for i, spreadsheet in enumerate(glc_metadata[data_type]["spreadsheets"]):
-        data[f"part{i+1}"] = _process_spreadsheet(path, spreadsheet)
-    return data
+def _process_raw_to_dataframe(data, var):
+    return curve_frame([data_section[var] for data_section in data.values()], var)
 
 
-def _process_raw_to_dataframe(data, var):
+def _build_dataframe(data_type, spreadsheets, workers=None, engine=None):
+    sheetname_map = glc_metadata[data_type]["sheetname_map"]
+    with stage("read"):
+        data = read_glc_data(data_type, workers=workers, engine=engine, spreadsheets=spreadsheets)
+    for part in data.keys():
+        for old_name in list(data[part].keys()):
+            data[part][sheetname_map[old_name]] = data[part].pop(old_name)
     dataframes = []
-    for part, data_section in data.items():
-        df = pd.DataFrame(data_section[var])
-        df = df.dropna(axis="columns", how="all")
-        df = df.dropna(axis="rows", thresh=df.shape[1]-1)
-        df.reset_index(inplace=True, drop=True)
-        df.columns = df.iloc[0].values
-        if "months:" in df.columns:
-            df.rename(columns={"months:": "date"}, inplace=True)
-            period_type = "month"
-        elif "years:" in df.columns:
-            df.rename(columns={"years:": "date"}, inplace=True)
-            period_type = "year"
-        df = df[2:].set_index("date")
-        df.columns = df.columns.map(lambda col: str(round(col, 2)))
-        df.columns = df.columns.map(lambda col: col[:-2] if str(col).endswith(".0") else col)
-        df.columns = df.columns.map(lambda x: f"{var}_{period_type}_{x}")
-        dataframes.append(df)
-    return pd.concat(dataframes).fillna(value=np.nan)
+    for sheet in dict.fromkeys(sheetname_map.values()):
+        with stage(f"curve_frame:{sheet}") as s:
+            dataframes.append(s.record(_process_raw_to_dataframe(data, sheet)))
+    with stage("concat") as s:
+        return s.record(pd.concat(dataframes, axis="columns"))
 
 
-def process():
+def process(workers=None, engine=None, incremental=False, verify=False):
     os.makedirs("../processed_data", exist_ok=True)
-    for data_type in glc_metadata:
-        sheetname_map = glc_metadata[data_type]["sheetname_map"]
-        data = read_glc_data(data_type)
-        for part in data.keys():
-            for old_name in list(data[part].keys()):
-                data[part][sheetname_map[old_name]] = data[part].pop(old_name)
-        dataframes = [_process_raw_to_dataframe(data, sheet)
-                      for sheet in sheetname_map.values()]
-        df = pd.concat(dataframes)
-        df.to_parquet(f"../processed_data/glc_{data_type}.parquet")
+    with stage("govt_liability_curve_pipeline"):
+        for data_type in glc_metadata:
+            with stage(data_type):
+                refresh(f"../processed_data/glc_{data_type}.parquet",
+                        glc_metadata[data_type]["path"],
+                        glc_metadata[data_type]["spreadsheets"],
+                        lambda members: _build_dataframe(data_type, members, workers, engine),
+                        incremental=incremental, verify=verify)
 
 
 if __name__ == "__main__":
-    process()
+    process(incremental="--incremental" in sys.argv, verify="--verify" in sys.argv)
     print(os.path.basename(__file__), "done")
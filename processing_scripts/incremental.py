@@ -0,0 +1,109 @@
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from zipfile import ZipFile
+from instrumentation import stage
+from storage import cast_schema, write_parquet
+
+
+MANIFEST_KEY = b"source_members"
+
+
+def member_fingerprints(path_to_zip, spreadsheets):
+    with ZipFile(path_to_zip, "r") as zf:
+        return {name: f"{zf.getinfo(name).CRC:08x}:{zf.getinfo(name).file_size}"
+                for name in spreadsheets}
+
+
+def read_manifest(parquet_path):
+    if not os.path.exists(parquet_path):
+        return None
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    if MANIFEST_KEY not in metadata:
+        return None
+    return json.loads(metadata[MANIFEST_KEY])
+
+
+def changed_members(spreadsheets, manifest, parquet_path):
+    """Members whose fingerprint differs from the one stored in parquet_path.
+
+    Every member is returned when the file or its manifest is missing, or
+    when the set of members has changed, i.e. when a full rebuild is needed.
+    """
+    stored = read_manifest(parquet_path)
+    if stored is None or set(stored) != set(manifest):
+        return list(spreadsheets)
+    return [name for name in spreadsheets if stored[name] != manifest[name]]
+
+
+def upsert(existing, new):
+    """Replace the stored rows from new's first date onwards with new.
+
+    The re-read members run to the newest one, so their date span is
+    replaced whole: dates they no longer cover are dropped rather than
+    left behind. Columns new adds go after their neighbours in new.
+    """
+    new.index = pd.to_datetime(new.index)
+    new.index.name = existing.index.name
+    columns = list(existing.columns)
+    for i, column in enumerate(new.columns):
+        if column not in existing.columns:
+            columns.insert(columns.index(new.columns[i - 1]) + 1 if i else 0, column)
+    kept = existing[existing.index < new.index.min()]
+    return pd.concat([kept, new]).reindex(columns=columns)
+
+
+def _as_stored(df):
+    # The frame as the active storage profile would write it, e.g. float32
+    # under archive, so that frames built along different paths compare.
+    table = pa.Table.from_pandas(df)
+    return table.cast(cast_schema(table.schema)).to_pandas()
+
+
+def write_with_manifest(df, parquet_path, manifest):
+    write_parquet(df, parquet_path, metadata={MANIFEST_KEY: json.dumps(manifest)})
+
+
+def refresh(parquet_path, path_to_zip, spreadsheets, build, incremental=False, verify=False):
+    """Rebuild parquet_path from the workbooks in path_to_zip.
+
+    build(members) parses the given members and returns their frame. In
+    incremental mode only the members from the first changed one onwards
+    are parsed, since later members take precedence on shared dates, and
+    their date span replaces the stored one. When stored dates in that
+    span are missing from the new frame, they may have been dropped from a
+    changed workbook or belong to an earlier one, so a full build is run
+    instead. verify also runs a full build and raises ValueError if the
+    upserted frame, as the storage profile writes it, differs from it.
+    """
+    name = os.path.basename(parquet_path)
+    manifest = member_fingerprints(path_to_zip, spreadsheets)
+    members = list(spreadsheets)
+    if incremental:
+        changed = changed_members(spreadsheets, manifest, parquet_path)
+        if not changed:
+            print(name, "up to date")
+            return
+        members = members[members.index(changed[0]):]
+    with stage("build") as s:
+        df = s.record(build(members))
+    if len(members) < len(spreadsheets):
+        existing = pd.read_parquet(parquet_path)
+        span = existing.index[existing.index >= pd.to_datetime(df.index).min()]
+        if not span.isin(pd.to_datetime(df.index)).all():
+            print(name, f"stored dates missing from {members}, rebuilding in full")
+            with stage("build") as s:
+                df = s.record(build(list(spreadsheets)))
+        else:
+            with stage("upsert") as s:
+                df = s.record(upsert(existing, df))
+            print(name, f"upserted {members}")
+            if verify:
+                with stage("verify") as s:
+                    full = s.record(build(list(spreadsheets)))
+                if not _as_stored(df).equals(_as_stored(full)):
+                    raise ValueError(f"{name}: incremental refresh differs from a full build")
+    with stage("write") as s:
+        write_with_manifest(s.record(df), parquet_path, manifest)
@@ -0,0 +1,119 @@
+import os
+import csv
+import json
+import time
+import resource
+import functools
+
+
+TRACE_ENV = "PIPELINE_TRACE"
+FIELDS = ["time", "pid", "pipeline", "stage", "wall_s", "cpu_s",
+          "max_rss_kb", "rss_growth_kb", "rows", "cols", "ok"]
+
+# Names of the stages currently open in this process, outermost first.
+_open_stages = []
+
+
+def _max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _shape(obj):
+    shape = getattr(obj, "shape", None)
+    if shape is None:
+        if not hasattr(obj, "__len__"):
+            return None, None
+        shape = (len(obj),)
+        if isinstance(obj, list) and obj and isinstance(obj[0], list):
+            shape = (len(obj), len(obj[0]))
+    return shape[0], shape[1] if len(shape) > 1 else None
+
+
+def _write(path, record):
+    if path.endswith(".csv"):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerow(record)
+    else:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class _Untraced:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def record(self, obj):
+        return obj
+
+
+_UNTRACED = _Untraced()
+
+
+class Stage:
+    """One timed stage; use stage() rather than constructing this directly.
+
+    record(obj) stores the row and column counts of a frame, array or list
+    and returns obj unchanged, so it can wrap an expression.
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.rows = self.cols = None
+
+    def record(self, obj):
+        self.rows, self.cols = _shape(obj)
+        return obj
+
+    def __enter__(self):
+        _open_stages.append(self.name)
+        self._stage = "/".join(_open_stages)
+        self._rss = _max_rss_kb()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        max_rss = _max_rss_kb()
+        _write(self.path, {"time": time.time(), "pid": os.getpid(),
+                           "pipeline": _open_stages[0], "stage": self._stage,
+                           "wall_s": round(wall, 6), "cpu_s": round(cpu, 6),
+                           "max_rss_kb": max_rss, "rss_growth_kb": max_rss - self._rss,
+                           "rows": self.rows, "cols": self.cols, "ok": exc_type is None})
+        _open_stages.pop()
+        return False
+
+
+def stage(name):
+    """Time the enclosed block when PIPELINE_TRACE names a trace file.
+
+    Each stage appends one record to the trace (CSV when the path ends in
+    .csv, JSON lines otherwise) with wall and CPU time, the process's peak
+    RSS and how much the stage raised it, and the rows/cols passed to
+    record(). Nested stages are recorded as outer/inner. When tracing is
+    off this returns a shared no-op context manager.
+    """
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return _UNTRACED
+    return Stage(name, path)
+
+
+def traced(name):
+    """Decorator form of stage(); records the shape of the return value."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as s:
+                return s.record(fn(*args, **kwargs))
+        return wrapper
+    return decorator
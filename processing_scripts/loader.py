@@ -0,0 +1,199 @@
+import os
+import functools
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from storage import INDEX_KEY, SNAPSHOT_DIR
+
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         "..", "processed_data"))
+
+DATASETS = {
+    "boe_rate": "boe_rate.parquet",
+    "boe_rate_changes": "boe_rate_changes.parquet",
+    "ftse100_pdfs": "ftse100_pdfs.parquet",
+    "short_sterling_pdfs": "short_sterling_pdfs.parquet",
+    "uk_house_price_index": "uk_house_price_index.parquet",
+    "uk_full_hpi": "uk_full_hpi",
+    "ois": "ois.parquet",
+    "glc_nominal": "glc_nominal.parquet",
+    "glc_real": "glc_real.parquet",
+    "glc_inflation": "glc_inflation.parquet",
+    "blc_nominal": "bank_liability_curve_nominal.parquet",
+    "combined": "combined.parquet",
+    "breakeven_spot": "derived/breakeven_spot.parquet",
+    "ois_glc_spread": "derived/ois_glc_spread.parquet",
+    "ftse100_implied_vol_std": "derived/ftse100_implied_vol_std.parquet",
+    "hpi_yoy": "derived/hpi_yoy.parquet",
+}
+
+
+def _dataset(path):
+    # A single parquet file, or a directory of hive-partitioned files.
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+
+@functools.lru_cache(maxsize=64)
+def _file_info(path, mtime_ns, size):
+    # Keyed on mtime and size, so a rewritten file is re-inspected.
+    dataset = _dataset(path)
+    schema = dataset.schema
+    pandas_metadata = schema.pandas_metadata or {}
+    index_columns = [column for column in pandas_metadata.get("index_columns", [])
+                     if isinstance(column, str)]
+    if not index_columns and "date" in schema.names:
+        index_columns = ["date"]
+    return schema, index_columns, dataset.count_rows()
+
+
+def version(path):
+    """(mtime_ns, size) of a dataset file, or the newest mtime and total size of a directory.
+
+    Changes whenever a pipeline rewrites the dataset, so callers holding
+    data read from it can tell when to reload.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    mtime_ns, size = os.stat(path).st_mtime_ns, 0
+    for directory, _, files in os.walk(path):
+        for file in files:
+            stat = os.stat(os.path.join(directory, file))
+            mtime_ns, size = max(mtime_ns, stat.st_mtime_ns), size + stat.st_size
+    return mtime_ns, size
+
+
+def _info(path):
+    return _file_info(path, *version(path))
+
+
+class Dataset:
+    """A lazy handle on one processed parquet file or partitioned dataset.
+
+    select(), between() and where() return new handles; nothing is read
+    until to_pandas() or to_arrow(), which push the column projection and
+    the filters down to the parquet reader, so partitions and row groups
+    outside them are skipped.
+    """
+
+    def __init__(self, name, path, columns=None, start=None, end=None, equals=None):
+        self.name = name
+        self.path = path
+        self._columns = columns
+        self.start = start
+        self.end = end
+        self.equals = equals or {}
+
+    @property
+    def schema(self):
+        return _info(self.path)[0]
+
+    @property
+    def index_columns(self):
+        return _info(self.path)[1]
+
+    @property
+    def num_rows(self):
+        return _info(self.path)[2]
+
+    @property
+    def columns(self):
+        if self._columns is not None:
+            return list(self._columns)
+        schema, index_columns, _ = _info(self.path)
+        return [name for name in schema.names
+                if name not in index_columns and not name.startswith("__index_level_")]
+
+    def select(self, columns):
+        unknown = set(columns) - set(self.schema.names)
+        if unknown:
+            raise KeyError(f"{self.name} has no columns {sorted(unknown)}")
+        return Dataset(self.name, self.path, list(columns), self.start, self.end, self.equals)
+
+    def between(self, start=None, end=None):
+        if not self.index_columns:
+            raise ValueError(f"{self.name} has no date index to filter on")
+        start = pd.Timestamp(start) if start is not None else self.start
+        end = pd.Timestamp(end) if end is not None else self.end
+        return Dataset(self.name, self.path, self._columns, start, end, self.equals)
+
+    def where(self, **equals):
+        """Keep rows whose columns equal the given values, e.g. where(area_code="E09000033")."""
+        unknown = set(equals) - set(self.schema.names)
+        if unknown:
+            raise KeyError(f"{self.name} has no columns {sorted(unknown)}")
+        return Dataset(self.name, self.path, self._columns, self.start, self.end,
+                       {**self.equals, **equals})
+
+    def _filter(self):
+        condition = None
+        for column, value in self.equals.items():
+            equal = ds.field(column) == value
+            condition = equal if condition is None else condition & equal
+        if self.start is not None:
+            lower = ds.field(self.index_columns[0]) >= self.start
+            condition = lower if condition is None else condition & lower
+        if self.end is not None:
+            upper = ds.field(self.index_columns[0]) <= self.end
+            condition = upper if condition is None else condition & upper
+        return condition
+
+    def to_arrow(self):
+        columns = None
+        if self._columns is not None:
+            columns = self.index_columns + [c for c in self._columns if c not in self.index_columns]
+        return _dataset(self.path).to_table(columns=columns, filter=self._filter())
+
+    def to_pandas(self):
+        return self.to_arrow().to_pandas()
+
+    def __repr__(self):
+        window = ""
+        if self.start is not None or self.end is not None:
+            window = f", {self.start} to {self.end}"
+        return f"<Dataset {self.name}: {len(self.columns)} columns{window}>"
+
+
+def open_dataset(name, data_dir=DATA_DIR):
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset {name}, expected one of {sorted(DATASETS)}")
+    path = os.path.join(data_dir, DATASETS[name])
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{name} has not been processed yet ({path})")
+    return Dataset(name, path)
+
+
+def load(name, columns=None, start=None, end=None, where=None, data_dir=DATA_DIR):
+    dataset = open_dataset(name, data_dir)
+    if where:
+        dataset = dataset.where(**where)
+    if columns is not None:
+        dataset = dataset.select(columns)
+    if start is not None or end is not None:
+        dataset = dataset.between(start, end)
+    return dataset.to_pandas()
+
+
+def open_snapshot(name="combined", columns=None, data_dir=DATA_DIR):
+    """The latest Arrow snapshot of name, memory-mapped, as a date-indexed frame.
+
+    Nothing is copied: the float columns are views of the mapped file, so
+    processes opening the same snapshot share its page-cache pages and the
+    frame is read-only. The symlink is resolved once, so a snapshot swapped
+    in by combine while a reader has this one open does not affect it.
+    """
+    link = os.path.join(data_dir, SNAPSHOT_DIR, f"{name}.arrow")
+    if not os.path.exists(link):
+        raise FileNotFoundError(f"{name} has no snapshot yet ({link})")
+    table = pa.ipc.open_file(pa.memory_map(os.path.realpath(link))).read_all()
+    index_column = (table.schema.metadata or {}).get(INDEX_KEY, b"").decode()
+    if columns is not None:
+        table = table.select(([index_column] if index_column else []) + list(columns))
+    df = table.to_pandas(split_blocks=True)
+    return df.set_index(index_column) if index_column else df
+
+
+def available(data_dir=DATA_DIR):
+    return [name for name, file in DATASETS.items()
+            if os.path.exists(os.path.join(data_dir, file))]
@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import loader
+from storage import publish_version
+
+
+CUBE_DIR = "../processed_data/pdf_cubes"
+QUANTITIES = ["level_implied", "log_implied", "implied_cumprob", "implied_vol"]
+# The implied vol column is labelled with the maturity in years, which the
+# maturity axis already holds, so it is stored as a single point.
+SINGLE_POINT = {"implied_vol": "value"}
+PERCENTILES = "implied_cumprob"
+_COLUMN = re.compile(r"^(?P<months>\d+)mo_mat_(?P<asset>.+?)_(?P<quantity>{})_(?P<point>[^_]+)$"
+                     .format("|".join(QUANTITIES)))
+
+
+def _point_order(points):
+    try:
+        return sorted(points, key=float)
+    except ValueError:
+        return list(points)
+
+
+def parse_columns(columns):
+    """Map wide PDF columns to (maturity in months, quantity, point) coordinates."""
+    parsed = {}
+    for column in columns:
+        match = _COLUMN.match(column)
+        if match is None:
+            raise ValueError(f"Unexpected column {column}")
+        quantity = match["quantity"]
+        parsed[column] = (int(match["months"]), quantity, SINGLE_POINT.get(quantity, match["point"]))
+    return parsed
+
+
+def write_cube(df, name, root=CUBE_DIR):
+    """Write a wide PDF frame as one (date, maturity, point) .npy chunk per quantity.
+
+    coords.json holds the dates, maturities (months) and each quantity's
+    points. root/name is a symlink to the newest versioned cube beside it,
+    swapped by storage.publish_version, so readers never see a partial one.
+    """
+    parsed = parse_columns(df.columns)
+    maturities = sorted({months for months, _, _ in parsed.values()})
+    points = {}
+    for months, quantity, point in parsed.values():
+        points.setdefault(quantity, [])
+        if point not in points[quantity]:
+            points[quantity].append(point)
+    points = {quantity: _point_order(points[quantity]) for quantity in QUANTITIES if quantity in points}
+
+    df = df.sort_index()
+    values = df.to_numpy(dtype=np.float64)
+    coords = {"name": name,
+              "dates": pd.DatetimeIndex(df.index).strftime("%Y-%m-%d").tolist(),
+              "maturity_months": maturities,
+              "points": points}
+
+    def write(path):
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for quantity, quantity_points in points.items():
+            chunk = np.lib.format.open_memmap(os.path.join(tmp_path, f"{quantity}.npy"), mode="w+",
+                                              dtype=np.float64,
+                                              shape=(len(df), len(maturities), len(quantity_points)))
+            chunk[:] = np.nan
+            for i, column in enumerate(df.columns):
+                months, column_quantity, point = parsed[column]
+                if column_quantity == quantity:
+                    chunk[:, maturities.index(months), quantity_points.index(point)] = values[:, i]
+            chunk.flush()
+            del chunk
+        with open(os.path.join(tmp_path, "coords.json"), "w") as f:
+            json.dump(coords, f)
+        os.replace(tmp_path, path)
+
+    publish_version(root, name, write)
+
+
+class PdfCube:
+    """A memory-mapped implied-PDF cube written by write_cube.
+
+    cube[quantity] is a read-only (date, maturity, point) memmap; nothing
+    is read from disk until it is sliced.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "coords.json")) as f:
+            coords = json.load(f)
+        self.name = coords["name"]
+        self.dates = pd.DatetimeIndex(coords["dates"], name="date")
+        self.maturities = coords["maturity_months"]
+        self.points = coords["points"]
+        self._chunks = {}
+
+    @property
+    def quantities(self):
+        return list(self.points)
+
+    def __getitem__(self, quantity):
+        if quantity not in self.points:
+            raise KeyError(f"{self.name} has no quantity {quantity}, expected one of {self.quantities}")
+        if quantity not in self._chunks:
+            self._chunks[quantity] = np.load(os.path.join(self.path, f"{quantity}.npy"), mmap_mode="r")
+        return self._chunks[quantity]
+
+    def frame(self, quantity, maturity):
+        """One maturity of a quantity as a date x point frame."""
+        values = self[quantity][:, self.maturities.index(maturity)]
+        return pd.DataFrame(values, index=self.dates, columns=self.points[quantity])
+
+    def to_array(self):
+        """The full (date, maturity, quantity, point) array, NaN where a quantity has fewer points."""
+        n_points = max(len(points) for points in self.points.values())
+        out = np.full((len(self.dates), len(self.maturities), len(self.points), n_points), np.nan)
+        for i, quantity in enumerate(self.points):
+            out[:, :, i, :len(self.points[quantity])] = self[quantity]
+        return out
+
+    def __repr__(self):
+        return (f"<PdfCube {self.name}: {len(self.dates)} dates x {len(self.maturities)} maturities,"
+                f" {', '.join(f'{q}[{len(p)}]' for q, p in self.points.items())}>")
+
+
+def open_cube(name, root=os.path.join(loader.DATA_DIR, "pdf_cubes")):
+    path = os.path.join(root, name)
+    if not os.path.exists(os.path.join(path, "coords.json")):
+        raise FileNotFoundError(f"{name} has not been processed yet ({path})")
+    # Pinned to the current version, so a later swap cannot mix two cubes.
+    return PdfCube(os.path.realpath(path))
+
+
+def _percentile_grid(cube):
+    return np.array([float(point) for point in cube.points[PERCENTILES]])
+
+
+def quantiles(cube, probabilities):
+    """Quantiles at the given probabilities for every date and maturity at once.
+
+    Linear in probability between the published percentiles; NaN outside
+    them. Returns shape (date, maturity, len(probabilities)).
+    """
+    grid = _percentile_grid(cube)
+    probabilities = np.atleast_1d(np.asarray(probabilities, dtype=np.float64))
+    levels = cube[PERCENTILES]
+    right = np.clip(np.searchsorted(grid, probabilities), 1, len(grid) - 1)
+    weight = (probabilities - grid[right - 1]) / (grid[right] - grid[right - 1])
+    out = levels[..., right - 1] * (1 - weight) + levels[..., right] * weight
+    out[..., (probabilities < grid[0]) | (probabilities > grid[-1])] = np.nan
+    return out
+
+
+MOMENTS = {"mean": "mean", "std": "deviation", "skew": "skew", "kurtosis": "kurtosis"}
+
+
+def moments(cube, distribution="level"):
+    """Mean, standard deviation, skew and kurtosis of the level or log distribution.
+
+    These are the moments the Bank publishes with each PDF (the
+    level_implied or log_implied quantity), as published. Returns a dict
+    of (date, maturity) arrays.
+    """
+    quantity = f"{distribution}_implied"
+    points = cube.points[quantity]
+    return {name: np.asarray(cube[quantity][..., points.index(point)])
+            for name, point in MOMENTS.items()}
@@ -0,0 +1,258 @@
+import os
+import json
+import stat
+import struct
+import socket
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import loader
+
+
+ADDRESS = ("127.0.0.1", 8742)
+DEFAULT_MAX_BYTES = 1024 ** 3
+_LENGTH = struct.Struct(">Q")
+
+
+def _send(sock, payload):
+    sock.sendall(_LENGTH.pack(len(payload)))
+    sock.sendall(payload)
+
+
+def _no_delay(sock):
+    # A frame is two sends; without this the second waits on a delayed ACK.
+    if sock.family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def _recv_exactly(sock, n):
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    while n:
+        received = sock.recv_into(view[len(buffer) - n:], n)
+        if not received:
+            raise EOFError("connection closed")
+        n -= received
+    return buffer
+
+
+def _recv(sock):
+    (length,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    return _recv_exactly(sock, length)
+
+
+class ColumnCache:
+    """Whole columns of the processed datasets, evicted least recently used.
+
+    A column is read once over its full date range with the date index,
+    sorted by date, so any date range is a zero-copy slice of the cached
+    arrays. Every request checks the dataset's mtime and size, and when a
+    pipeline has rewritten it the cached columns are dropped and reloaded.
+    """
+
+    def __init__(self, data_dir=loader.DATA_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.data_dir = data_dir
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.reloads = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def _drop(self, dataset):
+        for key in [key for key in self._entries if key[0] == dataset]:
+            self.bytes -= self._entries.pop(key).nbytes
+
+    def _load(self, handle, columns, version):
+        # Reads the index and the missing columns in one pass, sorted by date.
+        table = handle.select(columns).to_arrow()
+        index_column = handle.index_columns[0] if handle.index_columns else None
+        if index_column is not None:
+            dates = table.column(index_column).to_numpy()
+            if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+                table = table.take(np.argsort(dates, kind="stable"))
+        loaded = {(handle.name, name): table.column(name).combine_chunks()
+                  for name in columns + ([index_column] if index_column else [])}
+        with self._lock:
+            if self._versions.get(handle.name) != version:
+                return loaded
+            for key, array in loaded.items():
+                if key not in self._entries:
+                    self._entries[key] = array
+                    self.bytes += array.nbytes
+            # The request keeps its own references, so even what it just
+            # loaded can go when it alone is over budget.
+            while self.bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+        return loaded
+
+    def slice(self, dataset, columns=None, start=None, end=None):
+        """An Arrow table of the index and columns between start and end (inclusive)."""
+        handle = loader.open_dataset(dataset, self.data_dir)
+        columns = list(columns) if columns is not None else handle.columns
+        unknown = set(columns) - set(handle.schema.names)
+        if unknown:
+            raise KeyError(f"{dataset} has no columns {sorted(unknown)}")
+        index_column = handle.index_columns[0] if handle.index_columns else None
+        if index_column is None and (start is not None or end is not None):
+            raise ValueError(f"{dataset} has no date index to filter on")
+        columns = [name for name in columns if name != index_column]
+        version = loader.version(handle.path)
+
+        with self._lock:
+            if self._versions.get(dataset) != version:
+                if dataset in self._versions:
+                    self.reloads += 1
+                self._drop(dataset)
+                self._versions[dataset] = version
+            found = {}
+            for name in columns + ([index_column] if index_column else []):
+                if (dataset, name) in self._entries:
+                    self._entries.move_to_end((dataset, name))
+                    found[(dataset, name)] = self._entries[(dataset, name)]
+            missing = [name for name in columns if (dataset, name) not in found]
+            self.hits += len(columns) - len(missing)
+            self.misses += len(missing)
+            load_lock = self._load_locks.setdefault(dataset, threading.Lock())
+        if missing or (index_column and (dataset, index_column) not in found):
+            with load_lock:
+                found.update(self._load(handle, missing, version))
+
+        n_rows = len(found[(dataset, index_column)]) if index_column else handle.num_rows
+        lo, hi = 0, n_rows
+        if index_column is not None:
+            dates = found[(dataset, index_column)]
+            values = dates.to_numpy()
+            if start is not None:
+                lo = np.searchsorted(values, pd.Timestamp(start).to_datetime64().astype(values.dtype), "left")
+            if end is not None:
+                hi = np.searchsorted(values, pd.Timestamp(end).to_datetime64().astype(values.dtype), "right")
+        names = ([index_column] if index_column else []) + columns
+        arrays = [found[(dataset, name)].slice(lo, max(hi - lo, 0)) for name in names]
+        return pa.Table.from_arrays(arrays, names=names).replace_schema_metadata(
+            {b"index_column": (index_column or "").encode()})
+
+    def stats(self):
+        with self._lock:
+            return {"bytes": self.bytes, "max_bytes": self.max_bytes, "entries": len(self._entries),
+                    "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "reloads": self.reloads}
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    # One connection can carry any number of requests, each a JSON frame
+    # answered by a JSON header frame and, when ok, an Arrow IPC stream frame.
+
+    def handle(self):
+        _no_delay(self.request)
+        while True:
+            try:
+                request = json.loads(_recv(self.request))
+            except EOFError:
+                return
+            try:
+                if request.get("op") == "stats":
+                    _send(self.request, json.dumps({"ok": True, "stats": self.server.cache.stats()}).encode())
+                    continue
+                table = self.server.cache.slice(request["dataset"], request.get("columns"),
+                                                request.get("start"), request.get("end"))
+            except Exception as e:
+                _send(self.request, json.dumps({"ok": False, "error": f"{type(e).__name__}: {e}"}).encode())
+                continue
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            _send(self.request, json.dumps({"ok": True, "rows": table.num_rows}).encode())
+            _send(self.request, sink.getvalue())
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def make_server(address=ADDRESS, data_dir=loader.DATA_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """A threaded server on a (host, port) address, or a Unix socket path."""
+    if isinstance(address, str):
+        if os.path.lexists(address):
+            # Only a stale socket from an earlier server is cleared.
+            if not stat.S_ISSOCK(os.lstat(address).st_mode):
+                raise FileExistsError(f"{address} exists and is not a socket")
+            os.remove(address)
+        server = _UnixServer(address, _Handler)
+    else:
+        server = _TCPServer(tuple(address), _Handler)
+    server.cache = ColumnCache(data_dir, max_bytes)
+    return server
+
+
+class Client:
+    """A connection to the read service, reused across requests."""
+
+    def __init__(self, address=ADDRESS):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(address if isinstance(address, str) else tuple(address))
+        _no_delay(self.sock)
+
+    def _request(self, request):
+        _send(self.sock, json.dumps(request).encode())
+        header = json.loads(_recv(self.sock))
+        if not header["ok"]:
+            raise RuntimeError(header["error"])
+        return header
+
+    def fetch_arrow(self, dataset, columns=None, start=None, end=None):
+        self._request({"dataset": dataset, "columns": columns,
+                       "start": None if start is None else str(pd.Timestamp(start)),
+                       "end": None if end is None else str(pd.Timestamp(end))})
+        return pa.ipc.open_stream(_recv(self.sock)).read_all()
+
+    def fetch(self, dataset, columns=None, start=None, end=None):
+        """Like loader.load, but served from the cache: a frame indexed by date."""
+        table = self.fetch_arrow(dataset, columns, start, end)
+        index_column = table.schema.metadata[b"index_column"].decode()
+        df = table.to_pandas()
+        return df.set_index(index_column) if index_column else df
+
+    def stats(self):
+        return self._request({"op": "stats"})["stats"]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fetch(dataset, columns=None, start=None, end=None, address=ADDRESS):
+    with Client(address) as client:
+        return client.fetch(dataset, columns, start, end)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve slices of the processed datasets from memory")
+    parser.add_argument("--data-dir", default="../processed_data")
+    parser.add_argument("--host", default=ADDRESS[0])
+    parser.add_argument("--port", type=int, default=ADDRESS[1])
+    parser.add_argument("--unix", help="listen on this Unix socket path instead")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="cache memory budget")
+    args = parser.parse_args()
+    server = make_server(args.unix or (args.host, args.port), args.data_dir, args.max_bytes)
+    print(f"serving {os.path.abspath(args.data_dir)} on {args.unix or f'{args.host}:{args.port}'}")
+    server.serve_forever()
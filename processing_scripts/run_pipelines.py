@@ -0,0 +1,290 @@
+import os
+import ast
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from storage import PROFILES, PROFILE_ENV
+
+
+RAW = "../raw_data"
+PROCESSED = "../processed_data"
+STATE_PATH = "../.pipeline_state/runner.json"
+
+PIPELINES = {
+    "boe_rate_pipeline": {
+        "inputs": [f"{RAW}/Bank Rate  Bank of England Database.csv"],
+        "outputs": [f"{PROCESSED}/boe_rate.parquet",
+                    f"{PROCESSED}/boe_rate_changes.parquet"],
+    },
+    "ftse100_pdfs_pipeline": {
+        "inputs": [f"{RAW}/ftse100pdfs.xlsx"],
+        "outputs": [f"{PROCESSED}/ftse100_pdfs.parquet",
+                    f"{PROCESSED}/pdf_cubes/ftse100"],
+    },
+    "short_sterling_pdfs_pipeline": {
+        "inputs": [f"{RAW}/shortsterling_pdfs.xlsx"],
+        "outputs": [f"{PROCESSED}/short_sterling_pdfs.parquet",
+                    f"{PROCESSED}/pdf_cubes/short_sterling"],
+    },
+    "uk_house_price_index_pipeline": {
+        "inputs": [f"{RAW}/UK_House_price_index.xlsx"],
+        "outputs": [f"{PROCESSED}/uk_house_price_index.parquet"],
+    },
+    "uk_full_hpi_pipeline": {
+        "inputs": [f"{RAW}/UK-HPI-full-file-2017-01.csv"],
+        "outputs": [f"{PROCESSED}/uk_full_hpi"],
+    },
+    "overnight_index_swap_pipeline": {
+        "inputs": [f"{RAW}/oisddata.zip"],
+        "outputs": [f"{PROCESSED}/ois.parquet"],
+    },
+    "govt_liability_curve_pipeline": {
+        "inputs": [f"{RAW}/glcinflationddata.zip",
+                   f"{RAW}/glcnominalddata.zip",
+                   f"{RAW}/glcrealddata.zip"],
+        "outputs": [f"{PROCESSED}/glc_inflation.parquet",
+                    f"{PROCESSED}/glc_nominal.parquet",
+                    f"{PROCESSED}/glc_real.parquet"],
+    },
+    "bank_liability_nominal_curve_pipeline": {
+        "inputs": [f"{RAW}/blcnomddata.zip"],
+        "outputs": [f"{PROCESSED}/bank_liability_curve_nominal.parquet"],
+    },
+    "combine": {
+        "inputs": [f"{PROCESSED}/boe_rate.parquet",
+                   f"{PROCESSED}/ftse100_pdfs.parquet",
+                   f"{PROCESSED}/short_sterling_pdfs.parquet",
+                   f"{PROCESSED}/uk_house_price_index.parquet",
+                   f"{PROCESSED}/ois.parquet",
+                   f"{PROCESSED}/glc_inflation.parquet",
+                   f"{PROCESSED}/glc_nominal.parquet",
+                   f"{PROCESSED}/glc_real.parquet",
+                   f"{PROCESSED}/bank_liability_curve_nominal.parquet"],
+        "outputs": [f"{PROCESSED}/combined.parquet",
+                    f"{PROCESSED}/snapshots/combined.arrow"],
+        "entry_point": "combine_data",
+        "optional_inputs": True,
+    },
+    "curve_store": {
+        "inputs": [f"{PROCESSED}/glc_nominal.parquet",
+                   f"{PROCESSED}/glc_real.parquet",
+                   f"{PROCESSED}/glc_inflation.parquet",
+                   f"{PROCESSED}/bank_liability_curve_nominal.parquet",
+                   f"{PROCESSED}/ois.parquet"],
+        "outputs": [f"{PROCESSED}/curves"],
+        "entry_point": "build_curve_store",
+        "optional_inputs": True,
+    },
+    "aggregate_pyramid": {
+        "inputs": [f"{PROCESSED}/combined.parquet"],
+        "outputs": [f"{PROCESSED}/pyramid"],
+        "entry_point": "build_pyramid",
+    },
+    "derived_series": {
+        "inputs": [f"{PROCESSED}/glc_nominal.parquet",
+                   f"{PROCESSED}/glc_real.parquet",
+                   f"{PROCESSED}/ois.parquet",
+                   f"{PROCESSED}/ftse100_pdfs.parquet",
+                   f"{PROCESSED}/uk_house_price_index.parquet"],
+        "outputs": [f"{PROCESSED}/derived"],
+        "optional_inputs": True,
+    },
+}
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(path, previous=None):
+    # Make-style: trust an unchanged size and mtime, and only hash the file
+    # when they moved, so touching a file does not trigger a rebuild.
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+        return previous
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": _file_hash(path)}
+
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is b
+    return a["sha1"] == b["sha1"]
+
+
+def _code(name):
+    """{name}.py and the local modules it imports, directly or through others."""
+    found, pending = set(), [name]
+    while pending:
+        module = pending.pop()
+        if module in found or not os.path.exists(f"{module}.py"):
+            continue
+        found.add(module)
+        with open(f"{module}.py") as f:
+            tree = ast.parse(f.read(), f"{module}.py")
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split(".")[0])
+    return [f"{module}.py" for module in sorted(found)]
+
+
+def _node_inputs(name):
+    return PIPELINES[name]["inputs"] + _code(name)
+
+
+def _dependencies(name):
+    inputs = set(PIPELINES[name]["inputs"])
+    return {other for other, spec in PIPELINES.items()
+            if other != name and inputs & set(spec["outputs"])}
+
+
+def _load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _status(name, state):
+    """Return ("missing", paths), ("stale", fingerprints) or ("fresh", fingerprints)."""
+    spec = PIPELINES[name]
+    recorded = state.get(name, {})
+    fingerprints = {}
+    missing = []
+    for path in _node_inputs(name):
+        fingerprint = _fingerprint(path, recorded.get(path))
+        if fingerprint is None:
+            missing.append(path)
+        else:
+            fingerprints[path] = fingerprint
+    if missing and not spec.get("optional_inputs"):
+        return "missing", missing
+    if len(missing) == len(spec["inputs"]):
+        return "missing", missing
+    if not all(os.path.exists(path) for path in spec["outputs"]):
+        return "stale", fingerprints
+    if set(fingerprints) != set(recorded):
+        return "stale", fingerprints
+    if all(_same(fingerprints[path], recorded[path]) for path in fingerprints):
+        return "fresh", fingerprints
+    return "stale", fingerprints
+
+
+def _run_node(name, options):
+    entry_point = PIPELINES[name].get("entry_point", "process")
+    code = (f"import inspect, json, {name} as module\n"
+            f"fn = module.{entry_point}\n"
+            f"options = json.loads({json.dumps(json.dumps(options))})\n"
+            "params = inspect.signature(fn).parameters\n"
+            "fn(**{k: v for k, v in options.items() if k in params})\n")
+    return subprocess.run([sys.executable, "-c", code]).returncode
+
+
+def run(targets=None, jobs=None, force=False, dry_run=False, **options):
+    """Run the pipelines in dependency order, skipping up-to-date ones.
+
+    Independent pipelines run concurrently in up to `jobs` subprocesses.
+    options (workers, engine, incremental, verify) are passed to each process()
+    that accepts them. Returns the names of pipelines that failed.
+    """
+    targets = set(targets or PIPELINES)
+    for name in list(targets):
+        targets |= _dependencies(name)
+    state = _load_state()
+    pending = {name: _dependencies(name) & targets for name in targets}
+    done, failed, would_run = set(), set(), set()
+    running = {}
+    scheduled = {}
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        while pending or running:
+            for name in sorted(pending):
+                if pending[name] - done:
+                    if pending[name] & failed:
+                        print(f"{name}: skipped, upstream failed")
+                        failed.add(name)
+                        del pending[name]
+                    continue
+                upstream = pending.pop(name)
+                status, detail = _status(name, state)
+                if dry_run and upstream & would_run:
+                    # A real run would rebuild the upstream outputs first,
+                    # which makes this node stale too.
+                    print(f"{name}: would run")
+                    would_run.add(name)
+                    done.add(name)
+                elif status == "missing":
+                    print(f"{name}: skipped, missing {detail}")
+                    done.add(name)
+                elif status == "fresh" and not force:
+                    print(f"{name}: up to date")
+                    done.add(name)
+                elif dry_run:
+                    print(f"{name}: would run")
+                    would_run.add(name)
+                    done.add(name)
+                else:
+                    print(f"{name}: running")
+                    scheduled[name] = detail
+                    running[executor.submit(_run_node, name, options)] = name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                if future.result() == 0:
+                    state[name] = scheduled[name]
+                    _save_state(state)
+                    print(f"{name}: done")
+                    done.add(name)
+                else:
+                    print(f"{name}: failed")
+                    failed.add(name)
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the processing pipelines")
+    parser.add_argument("targets", nargs="*",
+                        help=f"pipelines to bring up to date (default: all of {', '.join(PIPELINES)})")
+    parser.add_argument("-j", "--jobs", type=int, help="pipelines to run at once")
+    parser.add_argument("--workers", type=int, help="processes per spreadsheet pipeline")
+    parser.add_argument("--engine", choices=["openpyxl", "stream"])
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--verify", action="store_true",
+                        help="check each incremental refresh against a full build")
+    parser.add_argument("--force", action="store_true", help="ignore up-to-date checks")
+    parser.add_argument("-n", "--dry-run", action="store_true")
+    parser.add_argument("--trace", help="append per-stage timings to this file (.csv, or JSON lines)")
+    parser.add_argument("--profile", choices=sorted(PROFILES),
+                        help="parquet storage profile (use with --force to rewrite fresh outputs)")
+    args = parser.parse_args()
+    unknown = set(args.targets) - set(PIPELINES)
+    if unknown:
+        parser.error(f"unknown pipelines {sorted(unknown)}")
+    if args.trace:
+        os.environ["PIPELINE_TRACE"] = os.path.abspath(args.trace)
+    if args.profile:
+        os.environ[PROFILE_ENV] = args.profile
+    options = {key: value for key, value in
+               {"workers": args.workers, "engine": args.engine,
+                "incremental": args.incremental, "verify": args.verify}.items() if value}
+    failed = run(args.targets, jobs=args.jobs, force=args.force, dry_run=args.dry_run, **options)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,122 @@
+import os
+import pickle
+import hashlib
+import tempfile
+from zipfile import ZipFile
+
+
+def member_key(path_to_zip, filename):
+    with ZipFile(path_to_zip, "r") as zf:
+        info = zf.getinfo(filename)
+    return f"{filename}:{info.CRC:08x}:{info.file_size}"
+
+
+def file_key(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return f"{os.path.basename(path)}:{digest.hexdigest()}"
+
+
+class SheetCache:
+    """On-disk cache of parsed sheets with size-bounded LRU eviction.
+
+    Entries are pickled to one file each; a hit refreshes the file's mtime,
+    which is what eviction orders on. The directory's total size is read
+    once and then tracked as entries are written, so the directory is only
+    scanned again when that total goes over max_bytes. Writes by other
+    processes sharing the directory are picked up at that scan.
+    """
+
+    def __init__(self, directory="../.cache/sheets", max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, source, name):
+        digest = hashlib.sha1(f"{source}|{name}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def get(self, source, name, count=True):
+        """The cached value, or None. count=False keeps metadata lookups,
+        such as sheet names, out of the hit and miss counts."""
+        path = self._path(source, name)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += count
+            return None
+        os.utime(path)
+        self.hits += count
+        return value
+
+    def put(self, source, name, value):
+        path = self._path(source, name)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(tmp_path, path)
+        if self._bytes is None:
+            self._bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._bytes += size - replaced
+        if self._bytes > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0}
+
+
+_default_cache = None
+
+
+def default_cache():
+    """The cache under PIPELINE_CACHE_DIR, or None when caching is off."""
+    global _default_cache
+    directory = os.environ.get("PIPELINE_CACHE_DIR")
+    if not directory:
+        return None
+    if _default_cache is None or _default_cache.directory != directory:
+        max_bytes = int(os.environ.get("PIPELINE_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+        _default_cache = SheetCache(directory, max_bytes)
+    return _default_cache
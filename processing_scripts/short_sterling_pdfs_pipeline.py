@@ -1,21 +1,15 @@
 import os
 import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
+from spreadsheets import read_workbook
+from instrumentation import stage
+from storage import write_parquet
+from pdf_cube import write_cube
 
 
-def read_short_sterling_pdfs_data():
+def read_short_sterling_pdfs_data(engine=None):
     path_to_file = "../raw_data/shortsterling_pdfs.xlsx"
-    data = {}
-    wb = load_workbook(filename=path_to_file, read_only=True, data_only=True)
-    sheetnames = [name for name in wb.sheetnames if "month" in name]
-    for sheet in sheetnames:
-        data[sheet] = [
-            [cell.value for cell in row] for row in wb[sheet].iter_rows(
-                min_row=1, min_col=1, max_row=wb[sheet].max_row, max_col=wb[sheet].max_column
-            )
-        ]
-    return data
+    return read_workbook(path_to_file, lambda name: "month" in name, engine=engine)
 
 
 def _clean_col(col, sheetname):
@@ -39,36 +33,50 @@ def _clean_col(col, sheetname):
 
 
 def _process_raw_to_dataframe(data, sheetname):
-    df = pd.DataFrame(data[sheetname]).fillna(value=np.nan)
-    df = df.dropna(axis="columns", how="all")
-    df = df.dropna(axis="rows", how="all")
-    df.drop([0, 1], inplace=True)
-    df.reset_index(inplace=True, drop=True)
-    df = df.transpose()
-    df[0].ffill(inplace=True)
-    df = df.transpose()
-    df.columns = (df.iloc[:3].replace(np.nan, '').astype(str) + " ").sum(numeric_only=False)
-    df.columns = df.columns.map(str.strip)
-    df = df[3:]
-    df.reset_index(inplace=True, drop=True)
-    df.columns = df.columns.map(lambda col: _clean_col(col, sheetname))
-    df["date"] = pd.to_datetime(df["date"], yearfirst=True)
-    df.set_index("date", inplace=True, drop=True)
+    with stage("frame") as s:
+        df = pd.DataFrame(data[sheetname]).fillna(value=np.nan)
+        df = df.dropna(axis="columns", how="all")
+        df = df.dropna(axis="rows", how="all")
+        df.drop([0, 1], inplace=True)
+        df.reset_index(inplace=True, drop=True)
+        s.record(df)
+    with stage("transpose_ffill"):
+        df = df.transpose()
+        df[0].ffill(inplace=True)
+        df = df.transpose()
+    with stage("header"):
+        df.columns = (df.iloc[:3].replace(np.nan, '').astype(str) + " ").sum(numeric_only=False)
+        df.columns = df.columns.map(str.strip)
+        df = df[3:]
+        df.reset_index(inplace=True, drop=True)
+        df.columns = df.columns.map(lambda col: _clean_col(col, sheetname))
+    with stage("dates"):
+        df["date"] = pd.to_datetime(df["date"], yearfirst=True)
+        df.set_index("date", inplace=True, drop=True)
     df.replace('', np.nan, inplace=True)
     df = df.dropna(axis="rows", thresh=df.shape[1]-1)
     return df
 
 
-def process():
+def process(engine=None):
     os.makedirs("../processed_data", exist_ok=True)
-    data = read_short_sterling_pdfs_data()
-    df_3mo = _process_raw_to_dataframe(data, '3 month constant maturity')
-    df_6mo = _process_raw_to_dataframe(data, '6 month constant maturity')
-    df_12mo = _process_raw_to_dataframe(data, '12 month constant maturity')
-    df = (df_3mo
-          .merge(df_6mo, how="outer", left_index=True, right_index=True)
-          .merge(df_12mo, how="outer", left_index=True, right_index=True)).astype(float)
-    df.to_parquet("../processed_data/short_sterling_pdfs.parquet")
+    with stage("short_sterling_pdfs_pipeline"):
+        with stage("read"):
+            data = read_short_sterling_pdfs_data(engine=engine)
+        with stage("transform:3mo") as s:
+            df_3mo = s.record(_process_raw_to_dataframe(data, '3 month constant maturity'))
+        with stage("transform:6mo") as s:
+            df_6mo = s.record(_process_raw_to_dataframe(data, '6 month constant maturity'))
+        with stage("transform:12mo") as s:
+            df_12mo = s.record(_process_raw_to_dataframe(data, '12 month constant maturity'))
+        with stage("merge") as s:
+            df = s.record((df_3mo
+                           .merge(df_6mo, how="outer", left_index=True, right_index=True)
+                           .merge(df_12mo, how="outer", left_index=True, right_index=True)).astype(float))
+        with stage("write"):
+            write_parquet(df, "../processed_data/short_sterling_pdfs.parquet")
+        with stage("write_cube"):
+            write_cube(df, "short_sterling")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+import io
+import os
+import re
+from zipfile import ZipFile
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import load_workbook
+import xlsx_reader
+from sheet_cache import default_cache, file_key, member_key
+from instrumentation import stage
+
+
+ENGINES = ("openpyxl", "stream")
+
+
+def _is_data_sheet(name):
+    return re.match(r"\d\.", name) is not None
+
+
+def _default_engine(engine):
+    if engine is None:
+        engine = os.environ.get("PIPELINE_XLSX_ENGINE", "openpyxl")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown xlsx engine {engine}, expected one of {ENGINES}")
+    return engine
+
+
+def _read_rows(ws):
+    return [
+        [cell.value for cell in row] for row in ws.iter_rows(
+            min_row=1, min_col=1, max_row=ws.max_row, max_col=ws.max_column
+        )
+    ]
+
+
+def _read_openpyxl(file, sheet_filter):
+    with stage("load_workbook"):
+        wb = load_workbook(filename=file, read_only=True, data_only=True)
+    data = {}
+    for sheet in filter(sheet_filter, wb.sheetnames):
+        with stage(f"materialise:{sheet}") as s:
+            data[sheet] = s.record(_read_rows(wb[sheet]))
+    return data
+
+
+def _read_uncached(file, sheet_filter, engine):
+    if engine == "stream":
+        with stage("stream_parse") as s:
+            return s.record(xlsx_reader.read_workbook(file, sheet_filter))
+    return _read_openpyxl(file, sheet_filter)
+
+
+def _read_through_cache(cache, source, engine, sheet_filter, open_file):
+    sheetnames = cache.get(source, "sheetnames", count=False)
+    if sheetnames is None:
+        with open_file() as f:
+            sheetnames = xlsx_reader.sheet_names(f)
+        cache.put(source, "sheetnames", sheetnames)
+    data = {}
+    for sheet in filter(sheet_filter, sheetnames):
+        data[sheet] = cache.get(source, f"{engine}:{sheet}")
+    missing = [sheet for sheet, value in data.items() if value is None]
+    if missing:
+        with open_file() as f:
+            parsed = _read_uncached(f, lambda name: name in missing, engine)
+        for sheet in missing:
+            cache.put(source, f"{engine}:{sheet}", parsed[sheet])
+            data[sheet] = parsed[sheet]
+    return data
+
+
+def read_workbook(path, sheet_filter, engine=None, cache=None):
+    """Read every sheet accepted by sheet_filter.
+
+    The openpyxl engine returns a list of row lists per sheet, the stream
+    engine a DataFrame with positional labels; both give the same frame
+    through pd.DataFrame. Sheets are served from cache (default: the one
+    under PIPELINE_CACHE_DIR) when the file's hash is unchanged.
+    """
+    engine = _default_engine(engine)
+    if cache is None:
+        cache = default_cache()
+    if not cache:
+        return _read_uncached(path, sheet_filter, engine)
+    return _read_through_cache(cache, file_key(path), engine, sheet_filter,
+                               lambda: open(path, "rb"))
+
+
+def _list_sheets(path_to_zip, filename):
+    return xlsx_reader.sheet_names(_open_member(path_to_zip, filename))
+
+
+def _read_sheet(path_to_zip, filename, sheet, engine):
+    return process_spreadsheet(path_to_zip, filename, engine,
+                               lambda name: name == sheet, cache=False)[sheet]
+
+
+def _open_member(path_to_zip, filename):
+    with ZipFile(path_to_zip, "r") as zf:
+        return io.BytesIO(zf.read(filename))
+
+
+def process_spreadsheet(path_to_zip, filename, engine=None, sheet_filter=_is_data_sheet, cache=None):
+    engine = _default_engine(engine)
+    if cache is None:
+        cache = default_cache()
+    if cache:
+        return _read_through_cache(cache, member_key(path_to_zip, filename), engine, sheet_filter,
+                                   lambda: _open_member(path_to_zip, filename))
+    if engine == "stream":
+        return _read_uncached(_open_member(path_to_zip, filename), sheet_filter, engine)
+    with ZipFile(path_to_zip, "r") as zf:
+        with zf.open(filename, "r") as f:
+            return _read_uncached(f, sheet_filter, engine)
+
+
+def read_spreadsheets(path_to_zip, spreadsheets, workers=None, engine=None, cache=None):
+    """Read each zipped workbook into {partN: {sheet: rows}}.
+
+    With more than one worker, every (zip, member, sheet) unit is parsed in
+    its own process. workers defaults to the PIPELINE_WORKERS environment
+    variable, or the serial path when that is unset. engine defaults to
+    PIPELINE_XLSX_ENGINE, or openpyxl. Cached sheets are never sent to the
+    pool, and freshly parsed ones are stored by the parent process.
+    """
+    engine = _default_engine(engine)
+    if cache is None:
+        cache = default_cache()
+    if workers is None:
+        workers = int(os.environ.get("PIPELINE_WORKERS", "1"))
+    if workers <= 1:
+        return {f"part{i+1}": process_spreadsheet(path_to_zip, spreadsheet, engine, cache=cache)
+                for i, spreadsheet in enumerate(spreadsheets)}
+
+    data = {f"part{i+1}": {} for i in range(len(spreadsheets))}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        sources = [member_key(path_to_zip, spreadsheet) if cache else None
+                   for spreadsheet in spreadsheets]
+        sheetnames = [cache.get(source, "sheetnames", count=False) if cache else None for source in sources]
+        listed = {i: executor.submit(_list_sheets, path_to_zip, spreadsheet)
+                  for i, spreadsheet in enumerate(spreadsheets) if sheetnames[i] is None}
+        for i, future in listed.items():
+            sheetnames[i] = future.result()
+            if cache:
+                cache.put(sources[i], "sheetnames", sheetnames[i])
+
+        futures = {}
+        for i, spreadsheet in enumerate(spreadsheets):
+            for sheet in filter(_is_data_sheet, sheetnames[i]):
+                value = cache.get(sources[i], f"{engine}:{sheet}") if cache else None
+                if value is None:
+                    futures[i, sheet] = executor.submit(_read_sheet, path_to_zip,
+                                                        spreadsheet, sheet, engine)
+                data[f"part{i+1}"][sheet] = value
+        for (i, sheet), future in futures.items():
+            data[f"part{i+1}"][sheet] = future.result()
+            if cache:
+                cache.put(sources[i], f"{engine}:{sheet}", data[f"part{i+1}"][sheet])
+    return data
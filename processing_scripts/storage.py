@@ -0,0 +1,167 @@
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+PROFILE_ENV = "PARQUET_PROFILE"
+PROFILE_KEY = b"storage_profile"
+# default matches a bare DataFrame.to_parquet. archive is lossy: values
+# keep about seven significant figures. query keeps float64 and sorts by
+# date into small row groups with page indexes, so date filters skip data.
+# The footer and page index hold an entry per column per row group, so
+# max_column_chunks caps row groups x columns and wide frames get fewer,
+# longer row groups.
+PROFILES = {
+    "default": {"float_type": None, "compression": "snappy", "compression_level": None,
+                "row_group_size": None, "max_column_chunks": None,
+                "sort_by_date": False, "page_index": False},
+    "archive": {"float_type": pa.float32(), "compression": "zstd", "compression_level": 9,
+                "row_group_size": None, "max_column_chunks": None,
+                "sort_by_date": False, "page_index": False},
+    "query": {"float_type": pa.float64(), "compression": "snappy", "compression_level": None,
+              "row_group_size": 1024, "max_column_chunks": 8192,
+              "sort_by_date": True, "page_index": True},
+}
+
+
+def get_profile(profile=None):
+    """The named profile, by default the one in PARQUET_PROFILE (or "default")."""
+    name = profile or os.environ.get(PROFILE_ENV) or "default"
+    if name not in PROFILES:
+        raise ValueError(f"Unknown parquet profile {name}, expected one of {sorted(PROFILES)}")
+    return name, PROFILES[name]
+
+
+def cast_schema(schema, profile=None):
+    """schema with its floating-point fields stored as the profile's float type."""
+    _, settings = get_profile(profile)
+    if settings["float_type"] is None:
+        return schema
+    for i, field in enumerate(schema):
+        if pa.types.is_floating(field.type):
+            schema = schema.set(i, field.with_type(settings["float_type"]))
+    return schema
+
+
+def writer_options(profile=None):
+    """Keyword arguments for pq.write_table or pq.ParquetWriter."""
+    _, settings = get_profile(profile)
+    options = {"compression": settings["compression"], "write_statistics": True,
+               "write_page_index": settings["page_index"]}
+    if settings["compression_level"] is not None:
+        options["compression_level"] = settings["compression_level"]
+    return options
+
+
+def row_group_size(num_rows, num_columns, profile=None):
+    """Rows per row group for a table of this shape, or None for the writer's default."""
+    _, settings = get_profile(profile)
+    size = settings["row_group_size"]
+    if size is None or settings["max_column_chunks"] is None:
+        return size
+    groups = max(settings["max_column_chunks"] // max(num_columns, 1), 1)
+    return max(size, -(-num_rows // groups))
+
+
+def write_parquet(df, path, profile=None, metadata=None):
+    """Write a frame to path with a storage profile.
+
+    metadata is merged into the schema metadata, alongside the profile's
+    name. Returns the name of the profile used.
+    """
+    name, settings = get_profile(profile)
+    if settings["sort_by_date"] and isinstance(df.index, pd.DatetimeIndex):
+        df = df.sort_index(kind="stable")
+    table = pa.Table.from_pandas(df)
+    table = table.cast(cast_schema(table.schema, name))
+    stored = dict(table.schema.metadata or {})
+    stored.update({key: value if isinstance(value, bytes) else str(value).encode()
+                   for key, value in (metadata or {}).items()})
+    stored[PROFILE_KEY] = name.encode()
+    pq.write_table(table.replace_schema_metadata(stored), path,
+                   row_group_size=row_group_size(table.num_rows, table.num_columns, name),
+                   **writer_options(name))
+    return name
+
+
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_KEEP = 3
+INDEX_KEY = b"index_column"
+
+
+def _snapshot_table(df):
+    # Floats go in as plain numpy buffers, NaN included, rather than with a
+    # null bitmap, so readers can hand the mapped pages straight to pandas.
+    index = df.index
+    names, arrays = [], []
+    if index.name is not None:
+        names.append(index.name)
+        arrays.append(pa.Array.from_pandas(index.to_series(index=None)))
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_float_dtype(series.dtype):
+            arrays.append(pa.array(series.to_numpy()))
+        else:
+            arrays.append(pa.Array.from_pandas(series))
+        names.append(str(column))
+    table = pa.Table.from_arrays(arrays, names=names)
+    return table.replace_schema_metadata({INDEX_KEY: (index.name or "").encode()})
+
+
+def _versions(directory, name, suffix):
+    prefix = f"{name}-"
+    numbers = [entry[len(prefix):len(entry) - len(suffix)] for entry in os.listdir(directory)
+               if entry.startswith(prefix) and entry.endswith(suffix)]
+    return sorted(int(number) for number in numbers if number.isdigit())
+
+
+def publish_version(directory, name, write, suffix="", keep=SNAPSHOT_KEEP):
+    """Write a new version of directory/<name><suffix> and swap it in.
+
+    write(path) creates the file or directory <name>-<version><suffix> at
+    path; the <name><suffix> symlink is then replaced atomically, so
+    readers see the old or the new version, never a partial one. All but
+    the newest keep versions are removed; readers that still have one
+    open are unaffected. Returns the path of the new version.
+    """
+    os.makedirs(directory, exist_ok=True)
+    versions = _versions(directory, name, suffix)
+    version = f"{name}-{(versions[-1] + 1) if versions else 1:06d}{suffix}"
+    path = os.path.join(directory, version)
+    write(path)
+    link = os.path.join(directory, f"{name}{suffix}")
+    if os.path.lexists(f"{link}.tmp"):
+        os.remove(f"{link}.tmp")
+    os.symlink(version, f"{link}.tmp")
+    if os.path.isdir(link) and not os.path.islink(link):
+        # written in place before versioning; a symlink cannot replace it
+        shutil.rmtree(link)
+    os.replace(f"{link}.tmp", link)
+
+    for old in versions[:max(len(versions) + 1 - keep, 0)]:
+        old_path = os.path.join(directory, f"{name}-{old:06d}{suffix}")
+        if os.path.isdir(old_path):
+            shutil.rmtree(old_path)
+        else:
+            os.remove(old_path)
+    return path
+
+
+def write_snapshot(df, directory, name, keep=SNAPSHOT_KEEP):
+    """Write df as an uncompressed Arrow IPC file and swap it in.
+
+    Each snapshot is a new file directory/snapshots/<name>-<version>.arrow
+    behind the <name>.arrow symlink, published by publish_version.
+    Returns the path of the new version.
+    """
+    table = _snapshot_table(df)
+
+    def write(path):
+        with pa.OSFile(f"{path}.tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(f"{path}.tmp", path)
+
+    return publish_version(os.path.join(directory, SNAPSHOT_DIR), name, write, ".arrow", keep)
@@ -1,17 +1,147 @@
 import os
 import re
+import shutil
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from instrumentation import stage
+from storage import cast_schema, publish_version, writer_options
 
 
-def process():
+path_to_csv = "../raw_data/UK-HPI-full-file-2017-01.csv"
+dataset_path = "../processed_data/uk_full_hpi"
+categorical_columns = ["RegionName", "AreaCode"]
+CHUNK_ROWS = 250_000
+ROW_GROUP_SIZE = 65_536
+# Rows held back across all areas before the largest areas are written early.
+MAX_BUFFERED_ROWS = 500_000
+
+
+def _clean_col(col):
+    col = col.replace("%", "Perc").replace("FTB", "Ftb").replace("FOO", "Foo")
+    col = col[:-1] + col[-1].lower()
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', col).lower()
+
+
+def _dtypes(path):
+    columns = pd.read_csv(path, nrows=0).columns
+    return {col: "category" if col in categorical_columns else str if col == "Date" else "float64"
+            for col in columns}
+
+
+def _schema(dtypes):
+    fields = [("date", pa.timestamp("us"))]
+    for col, dtype in dtypes.items():
+        if col == "Date":
+            continue
+        value_type = pa.dictionary(pa.int32(), pa.string()) if dtype == "category" else pa.float64()
+        fields.append((_clean_col(col), value_type))
+    return pa.schema(fields)
+
+
+def _chunks(path, dtypes, chunk_rows):
+    with pd.read_csv(path, dtype=dtypes, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            chunk.columns = chunk.columns.map(_clean_col)
+            chunk["date"] = pd.to_datetime(chunk["date"], format="%d/%m/%Y")
+            yield chunk
+
+
+class _PartitionBuffer:
+    """Rows per area code, written out as whole part files.
+
+    Each chunk only holds a few rows of every area, so appending chunks
+    straight to the area files would make each one a run of tiny row
+    groups. Rows are held back until an area has ROW_GROUP_SIZE of them,
+    until the areas together hold more than MAX_BUFFERED_ROWS (the largest
+    areas are then written first), or until the end. Every write is a new
+    part-NNNNN.parquet, so no file stays open.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._tables = {}
+        self._counts = {}
+        self._parts = {}
+
+    def add(self, area_code, table):
+        self._tables.setdefault(area_code, []).append(table)
+        self._counts[area_code] = self._counts.get(area_code, 0) + table.num_rows
+        self.rows += table.num_rows
+        if self._counts[area_code] >= ROW_GROUP_SIZE:
+            self._write(area_code, whole_groups=True)
+
+    def spill(self):
+        if self.rows <= MAX_BUFFERED_ROWS:
+            return
+        for area_code in sorted(self._counts, key=self._counts.get, reverse=True):
+            self._write(area_code)
+            if self.rows <= MAX_BUFFERED_ROWS // 2:
+                return
+
+    def close(self):
+        for area_code in list(self._counts):
+            self._write(area_code)
+
+    def _write(self, area_code, whole_groups=False):
+        table = pa.concat_tables(self._tables.pop(area_code))
+        n = table.num_rows - table.num_rows % ROW_GROUP_SIZE if whole_groups else table.num_rows
+        if n < table.num_rows:
+            self._tables[area_code] = [table.slice(n)]
+            self._counts[area_code] = table.num_rows - n
+        else:
+            del self._counts[area_code]
+        self.rows -= n
+        directory = os.path.join(self.path, f"area_code={area_code}")
+        part = self._parts.get(area_code, 0)
+        if part == 0:
+            os.makedirs(directory)
+        self._parts[area_code] = part + 1
+        pq.write_table(table.slice(0, n), os.path.join(directory, f"part-{part:05d}.parquet"),
+                       row_group_size=ROW_GROUP_SIZE, **writer_options())
+
+
+def _write_partitioned(chunks, schema, path):
+    # Each build is a new version beside path, swapped in behind the path
+    # symlink by storage.publish_version.
+    file_schema = cast_schema(schema.remove(schema.get_field_index("area_code")))
+
+    def write(version_path):
+        tmp_path = f"{version_path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        buffer = _PartitionBuffer(tmp_path)
+        for chunk in chunks:
+            with stage("chunk") as s:
+                s.record(chunk)
+                codes = chunk["area_code"].cat.codes.to_numpy()
+                order = np.argsort(codes, kind="stable")
+                present, starts = np.unique(codes[order], return_index=True)
+                table = (pa.Table.from_pandas(chunk[file_schema.names], preserve_index=False)
+                         .cast(file_schema).take(order))
+                ends = np.append(starts[1:], len(order))
+                for code, start, end in zip(present, starts, ends):
+                    buffer.add(chunk["area_code"].cat.categories[code], table.slice(start, end - start))
+                buffer.spill()
+        with stage("flush"):
+            buffer.close()
+        os.replace(tmp_path, version_path)
+
+    publish_version(os.path.dirname(path) or ".", os.path.basename(path), write)
+
+
+def process(chunk_rows=CHUNK_ROWS):
+    """Stream the UK-HPI full file into a parquet dataset partitioned by area code.
+
+    The CSV is read chunk_rows at a time with explicit dtypes, region name
+    and area code as categoricals, so memory stays flat as the file grows.
+    """
     os.makedirs("../processed_data", exist_ok=True)
-    df = pd.read_csv("../raw_data/UK-HPI-full-file-2017-01.csv")
-    df.columns = df.columns.map(lambda x: x.replace("%", "Perc").replace("FTB", "Ftb").replace("FOO", "Foo"))
-    df.columns = df.columns.map(lambda x: x[:-1] + x[-1].lower())
-    df.columns = df.columns.map(lambda x: re.sub(r'(?<!^)(?=[A-Z])', '_', x).lower())
-    df['date'] = pd.to_datetime(df['date'], dayfirst=False, yearfirst=False)
-    df.set_index('date', inplace=True, drop=True)
-    df.to_parquet("../processed_data/uk_full_hpi.parquet")
+    with stage("uk_full_hpi_pipeline"):
+        dtypes = _dtypes(path_to_csv)
+        _write_partitioned(_chunks(path_to_csv, dtypes, chunk_rows), _schema(dtypes), dataset_path)
 
 
 if __name__ == "__main__":
@@ -1,21 +1,14 @@
 import os
 import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
+from spreadsheets import read_workbook
+from instrumentation import stage
+from storage import write_parquet
 
 
-def read_hpi_data():
+def read_hpi_data(engine=None):
     path_to_file = "../raw_data/UK_House_price_index.xlsx"
-    data = {}
-    wb = load_workbook(filename=path_to_file, read_only=True, data_only=True)
-    sheetnames = [name for name in wb.sheetnames if name != "Metadata"]
-    for sheet in sheetnames:
-        data[sheet] = [
-            [cell.value for cell in row] for row in wb[sheet].iter_rows(
-                min_row=1, min_col=1, max_row=wb[sheet].max_row, max_col=wb[sheet].max_column
-            )
-        ]
-    return data
+    return read_workbook(path_to_file, lambda name: name != "Metadata", engine=engine)
 
 
 def _clean_col_by_type(col):
@@ -63,14 +56,21 @@ def _process_raw_to_dataframe_non_type(data, sheetname):
     return df
 
 
-def process():
+def process(engine=None):
     os.makedirs("../processed_data", exist_ok=True)
-    data = read_hpi_data()
-    dataframes = ([_process_raw_to_dataframe_by_type(data)]
-                  + [_process_raw_to_dataframe_non_type(data, sheetname)
-                     for sheetname in data.keys() if sheetname != "By type"])
-    df = pd.concat(dataframes, axis="columns")
-    df.to_parquet("../processed_data/uk_house_price_index.parquet")
+    with stage("uk_house_price_index_pipeline"):
+        with stage("read"):
+            data = read_hpi_data(engine=engine)
+        with stage("transform:By type") as s:
+            dataframes = [s.record(_process_raw_to_dataframe_by_type(data))]
+        for sheetname in data.keys():
+            if sheetname != "By type":
+                with stage(f"transform:{sheetname}") as s:
+                    dataframes.append(s.record(_process_raw_to_dataframe_non_type(data, sheetname)))
+        with stage("concat") as s:
+            df = s.record(pd.concat(dataframes, axis="columns"))
+        with stage("write"):
+            write_parquet(df, "../processed_data/uk_house_price_index.parquet")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,276 @@
+import re
+import posixpath
+import numpy as np
+import pandas as pd
+from zipfile import ZipFile
+from xml.etree.ElementTree import iterparse
+
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_SHEET_DATA = f"{_NS}sheetData"
+_DIMENSION = f"{_NS}dimension"
+_ROW = f"{_NS}row"
+_CELL = f"{_NS}c"
+_VALUE = f"{_NS}v"
+_INLINE = f"{_NS}is"
+
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+_FORMAT_LITERALS = re.compile(r'\[[^\]]*\]|"[^"]*"|\\.')
+_DATE_TOKENS = re.compile(r"[dmyhs]", re.IGNORECASE)
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+_EMPTY, _NUMBER, _DATE, _OTHER = 0, 1, 2, 3
+
+
+def _column_index(letters, _cache={}):
+    if letters not in _cache:
+        index = 0
+        for char in letters:
+            index = index * 26 + ord(char) - 64
+        _cache[letters] = index - 1
+    return _cache[letters]
+
+
+def _parse_ref(ref):
+    match = _CELL_REF.match(ref)
+    return int(match.group(2)) - 1, _column_index(match.group(1))
+
+
+def _read_workbook_xml(zf):
+    date1904 = False
+    sheets = []
+    for _, elem in iterparse(zf.open("xl/workbook.xml")):
+        if elem.tag == f"{_NS}workbookPr":
+            date1904 = elem.get("date1904", "0").lower() in ("1", "true")
+        elif elem.tag == f"{_NS}sheet":
+            sheets.append((elem.get("name"), elem.get(f"{_REL_NS}id")))
+    targets = {}
+    for _, elem in iterparse(zf.open("xl/_rels/workbook.xml.rels")):
+        if elem.tag == f"{_PKG_REL_NS}Relationship":
+            target = elem.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            targets[elem.get("Id")] = target
+    return date1904, [(name, targets[rel_id]) for name, rel_id in sheets]
+
+
+def _read_shared_strings(zf):
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    for _, elem in iterparse(zf.open("xl/sharedStrings.xml")):
+        if elem.tag == f"{_NS}si":
+            strings.append(_rich_text(elem))
+            elem.clear()
+    return strings
+
+
+def _rich_text(elem):
+    parts = []
+    for child in elem:
+        if child.tag == f"{_NS}t":
+            parts.append(child.text or "")
+        elif child.tag == f"{_NS}r":
+            parts.extend(t.text or "" for t in child.iter(f"{_NS}t"))
+    return "".join(parts)
+
+
+def _read_date_styles(zf):
+    if "xl/styles.xml" not in zf.namelist():
+        return set()
+    custom_formats = {}
+    xf_formats = []
+    in_cell_xfs = False
+    for event, elem in iterparse(zf.open("xl/styles.xml"), events=("start", "end")):
+        if elem.tag == f"{_NS}cellXfs":
+            in_cell_xfs = event == "start"
+        elif event == "end" and elem.tag == f"{_NS}numFmt":
+            custom_formats[int(elem.get("numFmtId"))] = elem.get("formatCode", "")
+        elif event == "end" and elem.tag == f"{_NS}xf" and in_cell_xfs:
+            xf_formats.append(int(elem.get("numFmtId", 0)))
+    date_styles = set()
+    for style_index, fmt_id in enumerate(xf_formats):
+        if fmt_id in custom_formats:
+            code = _FORMAT_LITERALS.sub("", custom_formats[fmt_id])
+            is_date = _DATE_TOKENS.search(code) is not None
+        else:
+            is_date = fmt_id in _BUILTIN_DATE_FORMATS
+        if is_date:
+            date_styles.add(str(style_index))
+    return date_styles
+
+
+def _serials_to_datetimes(serials, date1904):
+    if date1904:
+        epoch = np.datetime64("1904-01-01")
+    else:
+        epoch = np.datetime64("1899-12-30")
+        serials = np.where((serials > 0) & (serials < 60), serials + 1, serials)
+    micros = np.round(serials * 86_400_000_000).astype("int64")
+    return epoch + micros.astype("timedelta64[us]")
+
+
+class _ColumnBuffers:
+    """Preallocated float64 buffers plus per-cell kinds for one sheet."""
+
+    def __init__(self, n_rows, n_cols):
+        self.values = np.full((max(n_rows, 1), max(n_cols, 1)), np.nan)
+        self.kinds = np.zeros(self.values.shape, dtype=np.int8)
+        self.is_int = np.zeros(self.values.shape, dtype=bool)
+        self.shape = self.values.shape
+        self.others = {}
+        self.n_rows = 0
+        self.n_cols = 0
+
+    def _reserve(self, row, col):
+        rows, cols = self.shape
+        if row < rows and col < cols:
+            return
+        shape = (max(rows, (row + 1) * 2 if row >= rows else rows),
+                 max(cols, col + 1))
+        for name, fill in (("values", np.nan), ("kinds", 0), ("is_int", False)):
+            old = getattr(self, name)
+            new = np.full(shape, fill, dtype=old.dtype)
+            new[:rows, :cols] = old
+            setattr(self, name, new)
+        self.shape = shape
+
+    def set_number(self, row, col, text, kind):
+        self._reserve(row, col)
+        index = (row, col)
+        self.values[index] = float(text)
+        self.kinds[index] = kind
+        if kind == _NUMBER and "." not in text and "E" not in text and "e" not in text:
+            self.is_int[index] = True
+        self._extend(row, col)
+
+    def set_other(self, row, col, value):
+        self._reserve(row, col)
+        self.kinds[row, col] = _OTHER
+        self.others[row, col] = value
+        self._extend(row, col)
+
+    def _extend(self, row, col):
+        if row >= self.n_rows:
+            self.n_rows = row + 1
+        if col >= self.n_cols:
+            self.n_cols = col + 1
+
+    def to_frame(self, n_rows, n_cols, date1904):
+        n_rows = max(n_rows, self.n_rows)
+        n_cols = max(n_cols, self.n_cols)
+        self._reserve(n_rows - 1, n_cols - 1)
+        values = self.values[:n_rows, :n_cols]
+        kinds = self.kinds[:n_rows, :n_cols]
+        is_int = self.is_int[:n_rows, :n_cols]
+        others_by_col = {}
+        for (row, col), value in self.others.items():
+            others_by_col.setdefault(col, []).append((row, value))
+
+        columns = {}
+        for col in range(n_cols):
+            kind = kinds[:, col]
+            present = kind != _EMPTY
+            if not (kind == _DATE).any() and col not in others_by_col:
+                if present.all() and is_int[:, col].all():
+                    columns[col] = values[:, col].astype("int64")
+                else:
+                    columns[col] = values[:, col]
+                continue
+            if (kind[present] == _DATE).all():
+                column = np.full(n_rows, np.datetime64("NaT"), dtype="datetime64[us]")
+                column[present] = _serials_to_datetimes(values[present, col], date1904)
+                columns[col] = column
+                continue
+            column = np.full(n_rows, None, dtype=object)
+            numbers = kind == _NUMBER
+            column[numbers] = values[numbers, col].tolist()
+            ints = numbers & is_int[:, col]
+            column[ints] = values[ints, col].astype("int64").tolist()
+            dates = kind == _DATE
+            if dates.any():
+                stamps = _serials_to_datetimes(values[dates, col], date1904)
+                column[dates] = pd.DatetimeIndex(stamps).to_pydatetime()
+            for row, value in others_by_col.get(col, []):
+                column[row] = value
+            columns[col] = column
+        return pd.DataFrame(columns, index=pd.RangeIndex(n_rows), columns=pd.RangeIndex(n_cols))
+
+
+def _read_sheet_xml(source, shared_strings, date_styles, date1904):
+    buffers = None
+    sheet_data = None
+    n_rows = n_cols = 0
+    row = -1
+    col = -1
+    for event, elem in iterparse(source, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _ROW:
+                row = int(elem.get("r", row + 2)) - 1
+                col = -1
+            elif tag == _SHEET_DATA:
+                sheet_data = elem
+                buffers = _ColumnBuffers(n_rows, n_cols)
+            continue
+        if tag == _CELL:
+            ref = elem.get("r")
+            if ref:
+                row, col = _parse_ref(ref)
+            else:
+                col += 1
+            cell_type = elem.get("t", "n")
+            value_elem = elem.find(_VALUE)
+            text = value_elem.text if value_elem is not None else None
+            if cell_type == "inlineStr":
+                inline = elem.find(_INLINE)
+                buffers.set_other(row, col, _rich_text(inline) if inline is not None else "")
+            elif text is None:
+                pass
+            elif cell_type == "n":
+                kind = _DATE if elem.get("s") in date_styles else _NUMBER
+                buffers.set_number(row, col, text, kind)
+            elif cell_type == "s":
+                buffers.set_other(row, col, shared_strings[int(text)])
+            elif cell_type == "b":
+                buffers.set_other(row, col, text == "1")
+            else:
+                buffers.set_other(row, col, text)
+            elem.clear()
+        elif tag == _ROW:
+            sheet_data.clear()
+        elif tag == _DIMENSION:
+            bounds = elem.get("ref", "A1").split(":")[-1]
+            n_rows, n_cols = _parse_ref(bounds)
+            n_rows, n_cols = n_rows + 1, n_cols + 1
+    if buffers is None:
+        buffers = _ColumnBuffers(n_rows, n_cols)
+    return buffers.to_frame(n_rows, n_cols, date1904)
+
+
+def read_workbook(file, sheet_filter=None):
+    """Stream the sheets of an xlsx file into DataFrames with positional labels.
+
+    Returns {sheet: DataFrame} in workbook order, holding the same values as
+    openpyxl's read-only iter_rows would for the full sheet dimension.
+    """
+    with ZipFile(file, "r") as zf:
+        date1904, sheets = _read_workbook_xml(zf)
+        shared_strings = _read_shared_strings(zf)
+        date_styles = _read_date_styles(zf)
+        data = {}
+        for name, path in sheets:
+            if sheet_filter is not None and not sheet_filter(name):
+                continue
+            with zf.open(path) as source:
+                data[name] = _read_sheet_xml(source, shared_strings, date_styles, date1904)
+    return data
+
+
+def sheet_names(file):
+    with ZipFile(file, "r") as zf:
+        return [name for name, _ in _read_workbook_xml(zf)[1]]